@@ -0,0 +1,182 @@
+"""
+Benchmark del subsistema de memoria de Sassy (MemoriaContextual + GestorEmbeddings).
+Para cada tamaño de corpus sintético mide:
+  - rendimiento de inserción (recuerdos/s) con guardar_recuerdos_lote,
+  - latencia de buscar_recuerdos (p50/p95/p99),
+  - tiempo de arranque en un proceso nuevo (carga de SQLite + almacén vectorial),
+  - memoria residente (RSS) y tamaño en disco.
+Usa un codificador determinista, así que no descarga modelos ni necesita red.
+Cada tamaño corre en su propio proceso para que el RSS no se contamine.
+
+Uso:
+  python benchmarks/memoria/bench_memoria.py --tamanos 1000,10000,100000 --salida resultados.json
+  python benchmarks/memoria/bench_memoria.py --tamanos 1000000   # tarda y ocupa varios GB
+"""
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import numpy as np
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import CodificadorDeterminista, generar_consultas, generar_recuerdos
+
+
+def rss_mb():
+    """Memoria residente actual y pico del proceso, en MB (None si no se puede medir)."""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2 ** 20, None
+    except ImportError:
+        pass
+    actual = pico = None
+    try:
+        with open('/proc/self/status', encoding='utf-8') as f:
+            for linea in f:
+                if linea.startswith('VmRSS:'):
+                    actual = int(linea.split()[1]) / 1024
+                elif linea.startswith('VmHWM:'):
+                    pico = int(linea.split()[1]) / 1024
+    except OSError:
+        pass
+    return actual, pico
+
+
+def tamano_en_disco(directorio):
+    return sum(os.path.getsize(os.path.join(raiz, nombre)) for raiz, _, nombres in os.walk(directorio) for nombre in nombres)
+
+
+def percentiles(tiempos):
+    return {
+        'p50': float(np.percentile(tiempos, 50)),
+        'p95': float(np.percentile(tiempos, 95)),
+        'p99': float(np.percentile(tiempos, 99))
+    }
+
+
+def abrir_memoria(directorio):
+    from src.memoria.memoria import MemoriaContextual
+    return MemoriaContextual(os.path.join(directorio, 'memoria.db'), nutricion_activa=False,
+                             modelo_embeddings=CodificadorDeterminista())
+
+
+def medir_insercion_y_busqueda(directorio, tamano, consultas, tamano_lote):
+    """Llena una memoria nueva y mide inserción y búsqueda. Corre en un proceso hijo."""
+    memoria = abrir_memoria(directorio)
+    inicio = time.perf_counter()
+    lote = []
+    for recuerdo in generar_recuerdos(tamano):
+        lote.append(recuerdo)
+        if len(lote) >= tamano_lote:
+            memoria.guardar_recuerdos_lote(lote)
+            lote = []
+    memoria.guardar_recuerdos_lote(lote)
+    tiempo_insercion = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    memoria.guardar_estado_final()
+    tiempo_guardado = time.perf_counter() - inicio
+
+    tiempos = []
+    for consulta in generar_consultas(consultas):
+        inicio = time.perf_counter()
+        memoria.buscar_recuerdos(consulta, limite=10)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    filas = memoria._db.cursor().execute("SELECT COUNT(*) FROM recuerdos").fetchone()[0]
+    actual, pico = rss_mb()
+    return {
+        'recuerdos_generados': tamano,
+        'recuerdos_guardados': filas,
+        'insercion_s': tiempo_insercion,
+        'insercion_por_s': tamano / tiempo_insercion if tiempo_insercion else None,
+        'guardado_final_s': tiempo_guardado,
+        'busqueda_ms': percentiles(tiempos),
+        'rss_mb': actual,
+        'rss_pico_mb': pico
+    }
+
+
+def medir_carga(directorio):
+    """Arranque en frío sobre una memoria existente y la primera búsqueda. Corre en un proceso hijo."""
+    inicio = time.perf_counter()
+    memoria = abrir_memoria(directorio)
+    tiempo_carga = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    memoria.buscar_recuerdos(next(generar_consultas(1)), limite=10)
+    primera_busqueda = (time.perf_counter() - inicio) * 1000
+    actual, pico = rss_mb()
+    return {'carga_s': tiempo_carga, 'primera_busqueda_ms': primera_busqueda, 'rss_tras_carga_mb': actual}
+
+
+def ejecutar_hijo(argumentos):
+    salida = subprocess.run([sys.executable, os.path.abspath(__file__)] + argumentos,
+                            capture_output=True, text=True, check=True, cwd=RAIZ)
+    # La última línea es el JSON; lo anterior son mensajes de la memoria
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def commit_actual():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=RAIZ).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark del subsistema de memoria')
+    parser.add_argument('--tamanos', default='1000,10000,100000', help='tamaños de corpus separados por coma')
+    parser.add_argument('--consultas', type=int, default=200)
+    parser.add_argument('--tamano-lote', type=int, default=1000)
+    parser.add_argument('--salida', help='archivo donde guardar el JSON además de imprimirlo')
+    parser.add_argument('--conservar', action='store_true', help='no borrar los directorios temporales')
+    # Modos internos de los procesos hijos
+    parser.add_argument('--hijo-insercion', metavar='DIRECTORIO')
+    parser.add_argument('--hijo-carga', metavar='DIRECTORIO')
+    parser.add_argument('--tamano', type=int)
+    args = parser.parse_args()
+
+    if args.hijo_insercion:
+        print(json.dumps(medir_insercion_y_busqueda(args.hijo_insercion, args.tamano, args.consultas, args.tamano_lote)))
+        return
+    if args.hijo_carga:
+        print(json.dumps(medir_carga(args.hijo_carga)))
+        return
+
+    resultados = []
+    for tamano in (int(t) for t in args.tamanos.split(',')):
+        directorio = tempfile.mkdtemp(prefix=f'sassy_bench_{tamano}_')
+        try:
+            resultado = {'tamano': tamano}
+            resultado.update(ejecutar_hijo(['--hijo-insercion', directorio, '--tamano', str(tamano),
+                                            '--consultas', str(args.consultas), '--tamano-lote', str(args.tamano_lote)]))
+            resultado.update(ejecutar_hijo(['--hijo-carga', directorio]))
+            resultado['disco_bytes'] = tamano_en_disco(directorio)
+            resultados.append(resultado)
+            print(f'[Benchmark] {tamano} recuerdos: {resultado["insercion_por_s"]:.0f}/s, '
+                  f'búsqueda p99 {resultado["busqueda_ms"]["p99"]:.2f} ms', file=sys.stderr)
+        finally:
+            if not args.conservar:
+                shutil.rmtree(directorio, ignore_errors=True)
+    informe = {
+        'commit': commit_actual(),
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': sys.version.split()[0],
+        'resultados': resultados
+    }
+    texto = json.dumps(informe, indent=2)
+    print(texto)
+    if args.salida:
+        with open(args.salida, 'w', encoding='utf-8') as f:
+            f.write(texto)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,90 @@
+"""
+Microbenchmark del clasificador de recuerdos de Sassy.
+Compara la clasificación anterior (un `in` por palabra clave y un `re.search`
+por patrón de dato personal) con ClasificadorRecuerdos, que recorre el texto
+una sola vez, sobre turnos cortos y sobre extractos web largos. También
+comprueba que ambos den el mismo resultado.
+
+Uso: python benchmarks/memoria/clasificador.py [--textos 2000] [--repeticiones 5]
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from corpus import generar_consultas, generar_recuerdos
+from src.memoria.clasificador import PATRONES_DATOS, REGLAS, ClasificadorRecuerdos
+
+
+def clasificar_anterior(contenido, tipo="general", categorias=None):
+    """La implementación anterior de _clasificar_recuerdo + _extraer_dato_personal."""
+    categorias = list(categorias or [])
+    texto = contenido.lower()
+    for claves, tipo_regla, categoria in REGLAS:
+        if any(x in texto for x in claves):
+            tipo = tipo_regla
+            if categoria not in categorias:
+                categorias.append(categoria)
+    for patron, clave in PATRONES_DATOS:
+        m = re.search(patron, contenido.lower())
+        if m:
+            return tipo, categorias, (clave, m.group(1).strip())
+    return tipo, categorias, (None, None)
+
+
+def generar_textos(cantidad, largos):
+    """Turnos de usuario cortos o extractos web de ~5 KB (párrafos del corpus concatenados)."""
+    turnos = ["Usuario: me llamo Ana y vivo en Medellín", "Usuario: recuerda que mañana tengo cita",
+              "Usuario: mi color favorito es el verde", "Usuario: abre el navegador por favor"]
+    if not largos:
+        return [f"{turnos[i % len(turnos)]} {consulta}" for i, consulta in enumerate(generar_consultas(cantidad))]
+    parrafos = [r['contenido'] for r in generar_recuerdos(cantidad * 40)]
+    return [' '.join(parrafos[i * 40:(i + 1) * 40]) for i in range(cantidad)]
+
+
+def medir(funcion, textos, repeticiones):
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for texto in textos:
+            funcion(texto)
+        transcurrido = time.perf_counter() - inicio
+        mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+    return mejor / len(textos) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Microbenchmark del clasificador de recuerdos')
+    parser.add_argument('--textos', type=int, default=2000)
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    clasificador = ClasificadorRecuerdos()
+    resultados = {}
+    for nombre, largos in (('turnos', False), ('extractos_web', True)):
+        textos = generar_textos(args.textos if not largos else max(1, args.textos // 20), largos)
+        distintos = sum(clasificador.clasificar(t) != clasificar_anterior(t) for t in textos)
+        if distintos:
+            print(f'[Benchmark] {distintos} textos clasificados distinto en {nombre}', file=sys.stderr)
+        anterior = medir(clasificar_anterior, textos, args.repeticiones)
+        compilado = medir(clasificador.clasificar, textos, args.repeticiones)
+        resultados[nombre] = {
+            'textos': len(textos),
+            'caracteres_medios': sum(map(len, textos)) / len(textos),
+            'anterior_us': anterior,
+            'compilado_us': compilado,
+            'aceleracion': anterior / compilado,
+            'diferencias': distintos
+        }
+    print(json.dumps(resultados, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""
+Corpus sintético y codificador determinista para los benchmarks de memoria de Sassy.
+Genera recuerdos en español variados (para que la detección de duplicados no
+los descarte) y un codificador que no descarga modelos: cada palabra aporta
+un vector pseudoaleatorio fijo, así que textos con palabras en común quedan cerca.
+"""
+
+import hashlib
+import random
+import numpy as np
+
+SUJETOS = [
+    "mi hermana", "el profesor", "la vecina", "mi abuelo", "el equipo", "mi mejor amigo", "la doctora",
+    "el gato", "mi jefe", "la banda", "el alcalde", "mi prima", "el entrenador", "la cocinera", "mi papá"
+]
+VERBOS = [
+    "visitó", "recomendó", "compró", "olvidó", "preparó", "estudió", "celebró", "perdió", "encontró",
+    "explicó", "pintó", "escribió", "arregló", "vendió", "leyó"
+]
+OBJETOS = [
+    "un libro de historia", "la receta de ajiaco", "una guitarra vieja", "el mapa de Bogotá", "un curso de python",
+    "la bicicleta roja", "una novela de García Márquez", "el álbum de fotos", "un telescopio", "la cámara digital",
+    "un disco de salsa", "el tutorial de javascript", "una planta de café", "la camiseta de la selección", "un juego de mesa"
+]
+LUGARES = [
+    "en Medellín", "en la biblioteca", "en el parque", "en Cartagena", "en la oficina", "en el mercado",
+    "en la universidad", "en Cali", "en la playa", "en el museo", "en casa", "en el estadio", "en Manizales"
+]
+MOMENTOS = [
+    "el lunes", "ayer", "la semana pasada", "en diciembre", "durante las vacaciones", "esta mañana",
+    "hace dos años", "el fin de semana", "en su cumpleaños", "anoche"
+]
+COMENTARIOS = [
+    "y quedó muy contento", "aunque llovía mucho", "porque le interesa la ciencia", "para regalárselo a alguien",
+    "y me lo contó con detalle", "sin decirle a nadie", "con mucha paciencia", "y salió en las noticias",
+    "después de pensarlo bastante", "junto con sus compañeros"
+]
+CATEGORIAS = ["familia", "trabajo", "viajes", "comida", "musica", "tecnologia", "deportes", "lectura"]
+TIPOS = ["general", "interaccion", "nutricion_web", "hecho_usuario"]
+
+
+def generar_recuerdos(cantidad, semilla=0):
+    """Genera `cantidad` recuerdos como dicts aceptados por guardar_recuerdos_lote."""
+    rng = random.Random(semilla)
+    for i in range(cantidad):
+        contenido = (
+            f"{rng.choice(SUJETOS).capitalize()} {rng.choice(VERBOS)} {rng.choice(OBJETOS)} "
+            f"{rng.choice(LUGARES)} {rng.choice(MOMENTOS)} {rng.choice(COMENTARIOS)}, nota {i}."
+        )
+        yield {
+            'contenido': contenido,
+            'tipo': rng.choice(TIPOS),
+            'categorias': rng.sample(CATEGORIAS, 2),
+            'contexto': "benchmark"
+        }
+
+
+def generar_consultas(cantidad, semilla=1):
+    """Consultas cortas como las de un usuario: dos o tres conceptos del corpus."""
+    rng = random.Random(semilla)
+    fuentes = [SUJETOS, VERBOS, OBJETOS, LUGARES]
+    for _ in range(cantidad):
+        partes = [rng.choice(fuente) for fuente in rng.sample(fuentes, rng.choice((2, 3)))]
+        yield ' '.join(partes)
+
+
+class CodificadorDeterminista:
+    """Sustituto de SentenceTransformer: suma de vectores fijos por palabra, sin red ni GPU."""
+
+    def __init__(self, dimension=384):
+        self.dimension = dimension
+        self._vectores = {}
+
+    def _vector_palabra(self, palabra):
+        vector = self._vectores.get(palabra)
+        if vector is None:
+            semilla = int.from_bytes(hashlib.blake2b(palabra.encode('utf-8'), digest_size=8).digest(), 'little')
+            vector = np.random.default_rng(semilla).standard_normal(self.dimension).astype(np.float32)
+            self._vectores[palabra] = vector
+        return vector
+
+    def encode(self, textos, batch_size=64, **kwargs):
+        resultado = np.zeros((len(textos), self.dimension), dtype=np.float32)
+        for i, texto in enumerate(textos):
+            for palabra in texto.lower().split():
+                resultado[i] += self._vector_palabra(palabra.strip('.,;:¿?¡!'))
+        normas = np.linalg.norm(resultado, axis=1, keepdims=True)
+        normas[normas == 0] = 1.0
+        return resultado / normas
@@ -0,0 +1,96 @@
+"""
+Benchmark del índice aproximado (ANN) del almacén vectorial de Sassy.
+Carga N vectores sintéticos agrupados, construye el índice del backend elegido
+y mide la latencia por consulta (p50/p95/p99) y el recall@k frente a la
+búsqueda exacta.
+
+Uso: python benchmarks/memoria/latencia_ann.py [--registros 1000000] [--indice hnsw] [--ef-busqueda 64]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.memoria.almacen_vectorial import AlmacenVectorial
+
+
+def generar_vectores(registros, dimension, grupos, semilla):
+    """Vectores alrededor de centros aleatorios, generados por bloques para no duplicar memoria."""
+    rng = np.random.default_rng(semilla)
+    centros = rng.normal(size=(grupos, dimension)).astype(np.float32)
+    for inicio in range(0, registros, 100000):
+        filas = min(100000, registros - inicio)
+        asignacion = rng.integers(0, grupos, size=filas)
+        yield centros[asignacion] + rng.normal(scale=0.6, size=(filas, dimension)).astype(np.float32)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Latencia y recall del índice ANN')
+    parser.add_argument('--registros', type=int, default=1000000)
+    parser.add_argument('--dimension', type=int, default=384)
+    parser.add_argument('--grupos', type=int, default=2000)
+    parser.add_argument('--consultas', type=int, default=1000)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--indice', default='hnsw', choices=('hnsw', 'ivfpq', 'hnswlib'))
+    parser.add_argument('--ef-busqueda', type=int, default=64)
+    parser.add_argument('--nprobe', type=int, default=16)
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args()
+
+    directorio = tempfile.mkdtemp(prefix='sassy_ann_')
+    try:
+        # umbral_ann alto para que la construcción se haga aquí, de forma síncrona y medida
+        almacen = AlmacenVectorial(directorio, indice=args.indice, umbral_ann=args.registros + 1,
+                                   umbral_registros=args.registros + 1,
+                                   ef_busqueda=args.ef_busqueda, nprobe=args.nprobe)
+        inicio = time.perf_counter()
+        siguiente_id = 1
+        for bloque in generar_vectores(args.registros, args.dimension, args.grupos, args.semilla):
+            almacen.agregar(np.arange(siguiente_id, siguiente_id + len(bloque)), bloque)
+            siguiente_id += len(bloque)
+        almacen.guardar()
+        tiempo_carga = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        almacen.construir_indice_ann()
+        tiempo_indice = time.perf_counter() - inicio
+
+        consultas = np.concatenate(list(generar_vectores(args.consultas, args.dimension, args.grupos, args.semilla)))
+        consultas += np.random.default_rng(args.semilla + 1).normal(scale=0.3, size=consultas.shape).astype(np.float32)
+        tiempos, recall = [], []
+        for i, consulta in enumerate(consultas):
+            t = time.perf_counter()
+            aproximados = almacen.buscar(consulta, args.k)
+            tiempos.append((time.perf_counter() - t) * 1000)
+            if i < 100:  # La búsqueda exacta es lenta; basta una muestra para el recall
+                normalizada = consulta / np.linalg.norm(consulta)
+                exactos = {id_ for id_, _ in almacen._buscar_exacto(normalizada.astype(np.float32), args.k)}
+                recall.append(len(exactos & {id_ for id_, _ in aproximados}) / args.k)
+
+        print(json.dumps({
+            'indice': almacen.backend_ann,
+            'registros': len(almacen),
+            'dimension': args.dimension,
+            'k': args.k,
+            'ef_busqueda': args.ef_busqueda,
+            'nprobe': args.nprobe,
+            'carga_s': round(tiempo_carga, 2),
+            'construccion_indice_s': round(tiempo_indice, 2),
+            'latencia_ms_p50': float(np.percentile(tiempos, 50)),
+            'latencia_ms_p95': float(np.percentile(tiempos, 95)),
+            'latencia_ms_p99': float(np.percentile(tiempos, 99)),
+            'recall': float(np.mean(recall))
+        }, indent=2))
+    finally:
+        shutil.rmtree(directorio, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+"""
+Benchmark de compresión del almacén vectorial de Sassy.
+Genera vectores sintéticos agrupados (como los embeddings de frases parecidas),
+los guarda con cada compresión y compara recall@k, latencia y tamaño frente a
+la búsqueda exacta en float32.
+
+Uso: python benchmarks/memoria/recall_cuantizacion.py [--registros 50000] [--dimension 384]
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from src.memoria.almacen_vectorial import AlmacenVectorial
+
+
+def generar_vectores(registros, dimension, grupos, semilla):
+    """Vectores alrededor de centros aleatorios, para que haya vecinos cercanos reales."""
+    rng = np.random.default_rng(semilla)
+    centros = rng.normal(size=(grupos, dimension)).astype(np.float32)
+    asignacion = rng.integers(0, grupos, size=registros)
+    return centros[asignacion] + rng.normal(scale=0.6, size=(registros, dimension)).astype(np.float32)
+
+
+def medir(directorio, compresion, vectores, consultas, k, factor_reescalado):
+    almacen = AlmacenVectorial(directorio, compresion=compresion, factor_reescalado=factor_reescalado)
+    almacen.agregar(np.arange(1, len(vectores) + 1), vectores)
+    almacen.guardar()
+    tiempos = []
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        almacen.buscar(consulta, k)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    resultado = {
+        'compresion': compresion or 'float32',
+        'latencia_ms_p50': float(np.percentile(tiempos, 50)),
+        'latencia_ms_p95': float(np.percentile(tiempos, 95))
+    }
+    if compresion:
+        resultado.update(almacen.informe_recall(k=k, consultas=consultas))
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Recall y latencia del almacén vectorial comprimido')
+    parser.add_argument('--registros', type=int, default=50000)
+    parser.add_argument('--dimension', type=int, default=384)
+    parser.add_argument('--grupos', type=int, default=500)
+    parser.add_argument('--consultas', type=int, default=200)
+    parser.add_argument('--k', type=int, default=10)
+    parser.add_argument('--factor-reescalado', type=int, default=10)
+    parser.add_argument('--semilla', type=int, default=0)
+    args = parser.parse_args()
+
+    vectores = generar_vectores(args.registros, args.dimension, args.grupos, args.semilla)
+    consultas = generar_vectores(args.consultas, args.dimension, args.grupos, args.semilla + 1)
+    resultados = []
+    for compresion in (None, 'float16', 'int8'):
+        directorio = tempfile.mkdtemp(prefix='sassy_recall_')
+        try:
+            resultados.append(medir(directorio, compresion, vectores, consultas, args.k, args.factor_reescalado))
+        finally:
+            shutil.rmtree(directorio, ignore_errors=True)
+    print(json.dumps({
+        'registros': args.registros,
+        'dimension': args.dimension,
+        'k': args.k,
+        'resultados': resultados
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
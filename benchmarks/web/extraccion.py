@@ -0,0 +1,133 @@
+"""
+Benchmark de la extracción de texto de páginas web de Sassy.
+Compara la extracción anterior de obtener_contenido_url (BeautifulSoup con
+html.parser y get_text() dos veces por <p>) con extraer_parrafos en cada
+analizador instalado, sobre páginas guardadas (--fixtures, archivos .html) o,
+si no se indican, sobre páginas sintéticas parecidas a un artículo de
+Wikipedia: scripts y estilos en la cabecera, menús, barra lateral y pie.
+Mide páginas por segundo con la página completa y con el límite de descarga
+WEB_MAX_BYTES_PAGINA.
+
+Uso: python benchmarks/web/extraccion.py [--fixtures DIR] [--repeticiones 5]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+RAIZ = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+sys.path.insert(0, RAIZ)
+
+from src.core.config import WEB_MAX_BYTES_PAGINA
+from src.utils.extractor_html import BACKENDS, decodificar, extraer_parrafos, resolver_backend
+
+try:
+    from bs4 import BeautifulSoup
+except ImportError:
+    BeautifulSoup = None
+
+PALABRAS = (
+    "la historia de colombia incluye periodos de conquista colonia independencia y república con "
+    "cambios culturales económicos y políticos que marcaron a sus regiones ciudades y pueblos durante "
+    "siglos de mestizaje comercio café música literatura ciencia tecnología y educación pública"
+).split()
+
+
+def _frase(rng, minimo, maximo):
+    palabras = [rng.choice(PALABRAS) for _ in range(rng.randint(minimo, maximo))]
+    # Enlaces, negritas y entidades, como en un artículo real
+    for _ in range(len(palabras) // 12):
+        i = rng.randrange(len(palabras))
+        palabras[i] = rng.choice((f'<a href="/wiki/{palabras[i]}" title="{palabras[i]}">{palabras[i]}</a>',
+                                  f'<b>{palabras[i]}</b>', f'{palabras[i]} &amp; más', f'{palabras[i]}&nbsp;'))
+    return ' '.join(palabras).capitalize() + '.'
+
+
+def generar_pagina(parrafos, semilla=0):
+    """Página HTML sintética con `parrafos` párrafos de artículo y el ruido habitual alrededor."""
+    rng = random.Random(semilla)
+    partes = ['<!DOCTYPE html><html lang="es"><head><meta charset="UTF-8"><title>Artículo</title>',
+              '<style>' + 'body{margin:0;padding:0}.mw-body{font-family:sans-serif} ' * 400 + '</style>',
+              '<script>var config = {' + ', '.join(f'"k{i}": "<p>{i}</p>"' for i in range(1500)) + '};</script>',
+              '</head><body><header><nav><ul>']
+    partes.extend(f'<li><a href="/wiki/Seccion_{i}">Sección {i}</a></li>' for i in range(300))
+    partes.append('</ul></nav><p>Esta página se editó por última vez hace poco; el texto está disponible bajo licencia libre.</p></header>')
+    partes.append('<aside><div class="portal">')
+    partes.extend(f'<p>Portal {i}: ' + _frase(rng, 10, 14) + '</p>' for i in range(20))
+    partes.append('</div></aside><main><article><h1>Historia</h1>')
+    for i in range(parrafos):
+        if i % 8 == 0:
+            partes.append(f'<h2>Sección {i // 8}</h2><div class="thumb"><img src="/img/{i}.jpg" alt=""><div class="caption">Imagen {i}</div></div>')
+        partes.append('<p>' + ' '.join(_frase(rng, 12, 30) for _ in range(rng.randint(1, 5))) + '</p>')
+        if i % 15 == 14:
+            partes.append('<table class="wikitable"><tr><th>Año</th><th>Hecho</th></tr>')
+            partes.extend(f'<tr><td>{1800 + j}</td><td>{_frase(rng, 4, 8)}</td></tr>' for j in range(10))
+            partes.append('</table><ul>' + ''.join(f'<li>{_frase(rng, 5, 10)}</li>' for _ in range(6)) + '</ul>')
+    partes.append('</article></main><footer>')
+    partes.extend('<p>' + _frase(rng, 15, 25) + ' Política de privacidad y condiciones de uso.</p>' for _ in range(5))
+    partes.append('</footer><script>' + 'window.dataLayer.push({evento: "vista"});' * 300 + '</script></body></html>')
+    return ''.join(partes).encode('utf-8')
+
+
+def cargar_paginas(directorio):
+    """(nombre, bytes) de los .html guardados en `directorio`, o páginas sintéticas de varios tamaños."""
+    if directorio:
+        return [(nombre, open(os.path.join(directorio, nombre), 'rb').read())
+                for nombre in sorted(os.listdir(directorio)) if nombre.endswith(('.html', '.htm'))]
+    return [(f'sintetica_{n}p', generar_pagina(n, semilla=n)) for n in (40, 150, 1500)]
+
+
+def extraer_anterior(cuerpo):
+    """La implementación anterior de obtener_contenido_url, desde los bytes descargados."""
+    soup = BeautifulSoup(decodificar(cuerpo), 'html.parser')
+    return [p.get_text() for p in soup.find_all('p') if len(p.get_text()) > 60]
+
+
+def medir(funcion, paginas, repeticiones):
+    mejor = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        for cuerpo in paginas:
+            funcion(cuerpo)
+        transcurrido = time.perf_counter() - inicio
+        mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+    return len(paginas) / mejor
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de extracción de texto HTML')
+    parser.add_argument('--fixtures', help='Directorio con páginas .html guardadas')
+    parser.add_argument('--repeticiones', type=int, default=5)
+    args = parser.parse_args()
+
+    paginas = cargar_paginas(args.fixtures)
+    if not paginas:
+        sys.exit(f'[Benchmark] No hay páginas .html en {args.fixtures}')
+    backends = sorted({resolver_backend(b) for b in BACKENDS if b != 'auto'})
+    extractores = {f'extraer_parrafos[{b}]': (lambda cuerpo, b=b: extraer_parrafos(decodificar(cuerpo), backend=b)) for b in backends}
+    if BeautifulSoup is not None:
+        extractores = {'anterior[bs4]': extraer_anterior, **extractores}
+    else:
+        print('[Benchmark] bs4 no está instalado; se omite la extracción anterior.', file=sys.stderr)
+
+    resultados = {}
+    for nombre, cuerpo in paginas:
+        recortado = cuerpo[:WEB_MAX_BYTES_PAGINA]
+        fila = {'kb': len(cuerpo) / 1024, 'kb_con_limite': len(recortado) / 1024}
+        for extractor, funcion in extractores.items():
+            parrafos = funcion(cuerpo)
+            fila[extractor] = {
+                'parrafos': len(parrafos),
+                'caracteres': sum(map(len, parrafos)),
+                'paginas_s': medir(funcion, [cuerpo], args.repeticiones),
+                'paginas_s_con_limite': medir(funcion, [recortado], args.repeticiones)
+            }
+        resultados[nombre] = fila
+    print(json.dumps(resultados, indent=2, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    main()
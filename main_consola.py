@@ -198,6 +198,11 @@ class AsistenteAutonomo(Asistente):
             print(f"\nError: {e}")
         finally:
             self._detener_sistemas()
+            # Guardar estado antes de salir (vacía la cola de escritura diferida de la memoria)
+            self.memoria.guardar_estado_final()
+            self.emociones.guardar_estado()
+            if hasattr(self.contexto, 'guardar_contexto_final'):
+                self.contexto.guardar_contexto_final()
 
     def _mostrar_estado_sistema(self):
         """Muestra el estado actual de todos los sistemas"""
@@ -3,7 +3,7 @@ import psutil
 import logging
 import subprocess
 import platform
-import requests
+from src.utils.cliente_http import obtener_cliente_http
 import geoip2.database
 from pathlib import Path
 
@@ -26,7 +26,8 @@ class FirewallSassy:
     def actualizar_lista_negra(self, url: str = "https://feodotracker.abuse.ch/downloads/ipblocklist.txt"):
         """Descarga una lista negra pública de IPs"""
         try:
-            resp = requests.get(url, timeout=10)
+            # La lista negra se pide siempre a la red: una copia en caché dejaría pasar IPs recién añadidas
+            resp = obtener_cliente_http().get(url, timeout=10, usar_cache=False)
             if resp.status_code == 200:
                 for line in resp.text.splitlines():
                     if line and not line.startswith("#"):
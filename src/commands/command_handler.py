@@ -18,7 +18,7 @@ from src.utils.system_utils import (
 from src.utils.app_scanner import AppScanner
 from difflib import SequenceMatcher
 from src.utils.web_search import buscar_duckduckgo
-from src.memoria.memoria import MemoriaContextual
+from src.memoria.memoria import obtener_memoria
 from src.memoria.contexto import ContextoConversacional
 from src.emociones.emociones import GestorEmociones
 from src.core.feedback import FeedbackEntrenamiento
@@ -46,7 +46,7 @@ class CommandHandler:
             "escanear": self._comando_escanear
         }
         self.app_scanner = AppScanner()
-        self.memoria = MemoriaContextual(nutricion_activa=nutricion_activa)
+        self.memoria = obtener_memoria(nutricion_activa=nutricion_activa)
         self.contexto = ContextoConversacional()
         self.emociones = GestorEmociones()
         self.feedback = FeedbackEntrenamiento()
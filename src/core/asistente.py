@@ -7,13 +7,13 @@ import os
 from src.commands.command_handler import CommandHandler
 from src.core.config import ASISTENTE_NOMBRE, ASISTENTE_VERSION
 from src.leyes import LEY_1, LEY_2, LEY_3
-from src.memoria.memoria import MemoriaContextual
+from src.memoria.memoria import obtener_memoria
 from src.memoria.contexto import ContextoConversacional
+from src.memoria.clasificador import clasificador
 from src.emociones.emociones import GestorEmociones
 from src.core.feedback import FeedbackEntrenamiento
 from src.core.response_generator import ResponseGenerator
 import random
-import re
 import threading
 import logging
 
@@ -23,7 +23,7 @@ class Asistente:
         self.nombre = ASISTENTE_NOMBRE
         self.version = ASISTENTE_VERSION
         self.command_handler = CommandHandler(nutricion_activa=nutricion_activa)
-        self.memoria = MemoriaContextual(nutricion_activa=nutricion_activa)
+        self.memoria = obtener_memoria(nutricion_activa=nutricion_activa)
         self.contexto = ContextoConversacional()
         self.emociones = GestorEmociones()
         self.feedback = FeedbackEntrenamiento()
@@ -58,30 +58,16 @@ class Asistente:
         if entrada.lower() == "salir":
             # Generar respuesta de despedida usando el modelo, sin mensajes quemados
             respuesta = self.response_generator.generar_respuesta(entrada)
-            self.memoria.guardar_recuerdo(respuesta, tipo="asistente", contexto=self.contexto.obtener_contexto())
+            self.memoria.encolar_recuerdo(respuesta, tipo="asistente", contexto=self.contexto.obtener_contexto(), embedding=self.memoria.analizar(respuesta))
             return "salir", respuesta
         
         # TODO lo demás va al modelo Llama
         respuesta = self.response_generator.generar_respuesta(entrada)
-        self.memoria.guardar_recuerdo(respuesta, tipo="asistente", contexto=self.contexto.obtener_contexto())
+        self.memoria.encolar_recuerdo(respuesta, tipo="asistente", contexto=self.contexto.obtener_contexto(), embedding=self.memoria.analizar(respuesta))
         return "conversacion", respuesta
 
     def _extraer_dato_personal(self, texto):
-        patrones = [
-            (r"mi nombre es ([\wáéíóúüñ]+)", "nombre"),
-            (r"me llamo ([\wáéíóúüñ]+)", "nombre"),
-            (r"nací el ([\w\d/\- ]+)", "cumpleaños"),
-            (r"mi cumpleaños es ([\w\d/\- ]+)", "cumpleaños"),
-            (r"vivo en ([\wáéíóúüñ ]+)", "ciudad"),
-            (r"soy de ([\wáéíóúüñ ]+)", "ciudad"),
-            (r"mi color favorito es ([\wáéíóúüñ]+)", "color_favorito"),
-            (r"mi comida favorita es ([\wáéíóúüñ ]+)", "comida_favorita")
-        ]
-        for patron, clave in patrones:
-            m = re.search(patron, texto.lower())
-            if m:
-                return clave, m.group(1).strip()
-        return None, None
+        return clasificador.extraer_dato(texto)
 
     def _buscar_dato_personal(self, clave):
         # Buscar en recuerdos recientes y en la base de datos
@@ -38,4 +38,42 @@ APLICACIONES = {
 # Leyes de la robótica de Sassy (inspiradas en Asimov)
 LEY_1 = "Sassy no debe dañar a un ser humano ni, por inacción, permitir que un ser humano sufra daño."
 LEY_2 = "Sassy debe obedecer las órdenes dadas por los humanos, salvo que entren en conflicto con la primera ley."
-LEY_3 = "Sassy debe proteger su propia existencia en la medida en que esto no entre en conflicto con la primera o la segunda ley." 
\ No newline at end of file
+LEY_3 = "Sassy debe proteger su propia existencia en la medida en que esto no entre en conflicto con la primera o la segunda ley." 
+
+# Configuración de la memoria
+# Copia comprimida de los embeddings para la primera pasada de búsqueda: None, 'float16' o 'int8'
+MEMORIA_COMPRESION_EMBEDDINGS = None
+# Índice aproximado para la búsqueda semántica: 'auto', 'flat', 'hnsw', 'ivfpq' o 'hnswlib'
+MEMORIA_INDICE_ANN = 'auto'
+# A partir de cuántos recuerdos se deja la búsqueda exacta y se usa el índice aproximado
+MEMORIA_UMBRAL_ANN = 50000
+MEMORIA_ANN_EF_BUSQUEDA = 64   # HNSW: más alto = más recall y más latencia
+MEMORIA_ANN_NPROBE = 16        # IVF-PQ: listas recorridas por consulta
+# Búsquedas de recuerdos recientes que se guardan en caché (se invalidan al escribir)
+MEMORIA_CACHE_CONSULTAS = 256
+
+# Nutrición web concurrente
+NUTRICION_TRABAJADORES = 8              # Consultas en paralelo
+NUTRICION_CONCURRENCIA_POR_HOST = 4     # Peticiones simultáneas a un mismo sitio
+NUTRICION_PETICIONES_POR_SEGUNDO = 5.0  # Por sitio (cubo de tokens)
+NUTRICION_PLAZO_SEGUNDOS = 900          # Plazo total de una nutrición completa
+NUTRICION_FRESCURA_DIAS = 7             # Una consulta completada no se repite antes de esto
+NUTRICION_MAX_INTENTOS = 3              # Fallos seguidos antes de esperar a la siguiente ventana
+
+# Cliente HTTP compartido (keep-alive)
+HTTP_TIMEOUT = 10               # Segundos, si la llamada no indica otro
+HTTP_HOSTS_EN_POOL = 10         # Hosts distintos con conexiones guardadas
+HTTP_CONEXIONES_POR_HOST = 16   # Al menos NUTRICION_CONCURRENCIA_POR_HOST
+WEB_MAX_BYTES_PAGINA = 512 * 1024  # Descarga máxima de una página al extraer su texto
+
+# Caché persistente de respuestas HTTP (solo GET de las búsquedas web)
+HTTP_CACHE_RUTA = 'data/cache_http.db'
+HTTP_CACHE_MAX_MB = 200
+HTTP_CACHE_TTL_DEFECTO = 3600   # Segundos
+HTTP_CACHE_TTL_POR_HOST = {
+    'es.wikipedia.org': 7 * 24 * 3600,    # Los artículos cambian poco
+    'www.googleapis.com': 24 * 3600,
+    'api.duckduckgo.com': 24 * 3600,
+}
+# True: no se sale a la red; solo se responde con lo que haya en caché
+HTTP_MODO_OFFLINE = False
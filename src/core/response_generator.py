@@ -36,8 +36,10 @@ class ResponseGenerator:
     def generar_respuesta(self, texto: str) -> str:
         # Obtener las 2 últimas interacciones recientes
         historial = self.memoria.obtener_ultimas_interacciones(2)
+        # La entrada se embebe una sola vez: la misma se usa para buscar y para guardar
+        entrada = self.memoria.analizar(texto)
         # Buscar hasta 3 recuerdos relevantes, priorizando datos personales y hechos importantes
-        recuerdos_relevantes = self.memoria.buscar_recuerdos(texto, limite=10)
+        recuerdos_relevantes = self.memoria.buscar_recuerdos(texto, limite=10, embedding=entrada)
         # Filtrar y priorizar recuerdos importantes
         importantes = [r for r in recuerdos_relevantes if any(cat in r.get('categorias', []) for cat in ['nombre','ubicacion','gustos','dato_usuario','preferencia','recordatorio'])]
         if len(importantes) < 3:
@@ -49,12 +51,16 @@ class ResponseGenerator:
         respuesta_local = self.modelo_local.generar_respuesta(prompt)
         if not self.es_respuesta_generica(respuesta_local):
             # Guardar la interacción en memoria persistente
-            self.memoria.agregar_interaccion(texto, respuesta_local)
+            self._guardar_turno(entrada, respuesta_local)
             return respuesta_local
         respuesta_api = self.modelo_openrouter.generar_respuesta(prompt)
-        self.memoria.agregar_interaccion(texto, respuesta_api)
+        self._guardar_turno(entrada, respuesta_api)
         return respuesta_api
 
+    def _guardar_turno(self, entrada, respuesta: str) -> None:
+        """Guarda la interacción compartiendo los análisis del turno con la memoria."""
+        self.memoria.agregar_interaccion(entrada.texto, respuesta, analisis_entrada=entrada, analisis_respuesta=self.memoria.analizar(respuesta))
+
     def _construir_prompt_memoria(self, entrada: str, historial: list, recuerdos: list) -> str:
         """
         Construye el prompt para el modelo incluyendo historial y recuerdos relevantes.
@@ -2,7 +2,7 @@ from src.core.asistente import Asistente
 from src.core.response_generator import ResponseGenerator
 from src.modelos.modelo_llama import ModeloLlama
 from src.modelos.modelo_openrouter import ModeloOpenRouter
-from src.memoria.memoria import MemoriaContextual
+from src.memoria.memoria import obtener_memoria
 from src.emociones.emociones import GestorEmociones
 from src.config.modelo_config import MODELO_CONFIG, GENERACION_CONFIG, SISTEMA_PROMPT
 import os
@@ -27,7 +27,7 @@ class ChatAdapter:
             )
             
             self.modelo_openrouter = ModeloOpenRouter()
-            self.memoria = MemoriaContextual()
+            self.memoria = obtener_memoria()
             self.emociones = GestorEmociones()
             self.response_generator = ResponseGenerator(
                 memoria=self.memoria,
@@ -48,8 +48,11 @@ class ChatAdapter:
             # Obtener las 2 últimas interacciones recientes
             historial = self.memoria.obtener_ultimas_interacciones(2)
             
+            # El mensaje se embebe una sola vez: el mismo análisis se usa para buscar y para guardar
+            entrada = self.memoria.analizar(mensaje)
+            
             # Buscar hasta 3 recuerdos relevantes, priorizando datos personales y hechos importantes
-            recuerdos_relevantes = self.memoria.buscar_recuerdos(mensaje, limite=10)
+            recuerdos_relevantes = self.memoria.buscar_recuerdos(mensaje, limite=10, embedding=entrada)
             
             # Filtrar y priorizar recuerdos importantes
             importantes = [r for r in recuerdos_relevantes if any(cat in r.get('categorias', []) for cat in ['nombre','ubicacion','gustos','dato_usuario','preferencia','recordatorio'])]
@@ -71,13 +74,17 @@ class ChatAdapter:
             respuesta_local = self.modelo_local.generar_respuesta(prompt)
             if not self.response_generator.es_respuesta_generica(respuesta_local):
                 # Guardar la interacción en memoria persistente
-                self.memoria.agregar_interaccion(mensaje, respuesta_local)
+                self._guardar_turno(entrada, respuesta_local)
                 return respuesta_local
                 
             respuesta_api = self.modelo_openrouter.generar_respuesta(prompt)
-            self.memoria.agregar_interaccion(mensaje, respuesta_api)
+            self._guardar_turno(entrada, respuesta_api)
             return respuesta_api
             
         except Exception as e:
             logging.error(f"[ERROR ChatAdapter] Error al procesar mensaje: {e}")
-            return "Lo siento, tuve un problema para procesar tu mensaje. ¿Podrías intentarlo de nuevo?" 
\ No newline at end of file
+            return "Lo siento, tuve un problema para procesar tu mensaje. ¿Podrías intentarlo de nuevo?"
+
+    def _guardar_turno(self, entrada, respuesta: str) -> None:
+        """Guarda la interacción reutilizando los embeddings del turno."""
+        self.memoria.agregar_interaccion(entrada.texto, respuesta, analisis_entrada=entrada, analisis_respuesta=self.memoria.analizar(respuesta))
\ No newline at end of file
@@ -1,8 +1,8 @@
-from src.memoria.memoria import MemoriaContextual
+from src.memoria.memoria import obtener_memoria
 
 class MemoriaAdapter:
     def __init__(self):
-        self.memoria = MemoriaContextual()
+        self.memoria = obtener_memoria()
 
     def obtener_recuerdos(self):
         """Devuelve todos los recuerdos almacenados."""
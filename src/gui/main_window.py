@@ -109,6 +109,9 @@ class SassyMainWindow(QMainWindow):
         self.logs_timer.timeout.connect(self._actualizar_logs_panel)
         self.logs_timer.start(3000)  # Actualiza cada 3 segundos
 
+        # Al cerrar la aplicación se guarda la memoria (vacía la cola de escritura diferida)
+        QApplication.instance().aboutToQuit.connect(self._guardar_estado_al_salir)
+
         # Sincronizar configuración inicial
         self.config_page.modo_oscuro_cb.setChecked(self.dark_mode)
         self.config_page.notificaciones_cb.setChecked(self.funciones['notificaciones'])
@@ -260,6 +263,10 @@ class SassyMainWindow(QMainWindow):
         self.aprendizaje_adapter.iniciar_ciclo()
         self.show_notification("Ciclo de aprendizaje iniciado.")
 
+    def _guardar_estado_al_salir(self):
+        """Guarda el estado final de la memoria antes de que termine la aplicación."""
+        self.memoria_adapter.memoria.guardar_estado_final()
+
 if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = SassyMainWindow()
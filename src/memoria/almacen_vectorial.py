@@ -0,0 +1,668 @@
+"""
+Almacén vectorial persistente para Sassy.
+Guarda los embeddings como una matriz float32 contigua con IDs estables
+(los mismos de la columna recuerdos.id en SQLite) y la abre memory-mapped.
+
+Las inserciones nuevas se anexan a un log de segmentos; una compactación en
+segundo plano las fusiona con la matriz principal cuando se alcanza un umbral
+de tamaño o de tiempo. Al arrancar se reproducen los segmentos no fusionados.
+
+Opcionalmente (compresion='float16' o 'int8') mantiene además una copia
+comprimida para una primera pasada aproximada; los mejores candidatos se
+vuelven a puntuar con los float32 exactos, que se leen del mmap en disco.
+
+Por encima de `umbral_ann` vectores la búsqueda pasa a un índice aproximado
+(HNSW o IVF-PQ, ver indice_ann.py) que se construye en segundo plano y se
+actualiza con cada inserción; hasta que está listo se usa la búsqueda exacta.
+"""
+
+import glob
+import json
+import os
+import re
+import struct
+import threading
+import time
+import numpy as np
+from .indice_ann import crear_indice_ann, resolver_backend
+
+try:
+    import faiss
+except ImportError:  # Sin faiss se usa la búsqueda con NumPy
+    faiss = None
+
+# Cabecera de cada registro del segmento: id del recuerdo y dimensión del vector
+_CABECERA = struct.Struct('<qI')
+
+# Filas por bloque al recorrer matrices grandes (acota la memoria temporal)
+_FILAS_POR_BLOQUE = 16384
+
+COMPRESIONES = (None, 'float16', 'int8')
+
+# Archivos que forman una generación; los comprimidos solo existen con compresión activa.
+# 'ordenados' son los IDs ordenados: permiten saber si un ID está sin armar un set en RAM
+_TIPOS_GENERACION = ('vectores', 'ids', 'ordenados', 'float16', 'int8', 'escalas')
+
+
+def cuantizar(vectores, compresion):
+    """Comprime vectores float32. Para int8 usa una escala por vector; devuelve (matriz, escalas)."""
+    if compresion == 'float16':
+        return vectores.astype(np.float16), None
+    maximos = np.abs(vectores).max(axis=1)
+    maximos[maximos == 0] = 1.0
+    escalas = (maximos / 127.0).astype(np.float32)
+    return np.round(vectores / escalas[:, None]).astype(np.int8), escalas
+
+
+def _puntajes_aproximados(matriz, escalas, consulta):
+    """Producto interno de la consulta contra una matriz comprimida, bloque a bloque."""
+    puntajes = np.empty(len(matriz), dtype=np.float32)
+    for inicio in range(0, len(matriz), _FILAS_POR_BLOQUE):
+        bloque = matriz[inicio:inicio + _FILAS_POR_BLOQUE].astype(np.float32)
+        puntajes[inicio:inicio + len(bloque)] = bloque @ consulta
+    if escalas is not None:
+        puntajes *= escalas
+    return puntajes
+
+
+def _top_k(puntajes, k):
+    """Índices de los k mayores puntajes, ordenados de mayor a menor."""
+    if k < len(puntajes):
+        candidatos = np.argpartition(-puntajes, k - 1)[:k]
+    else:
+        candidatos = np.arange(len(puntajes))
+    return candidatos[np.argsort(-puntajes[candidatos])]
+
+
+class AlmacenVectorial:
+    def __init__(self, directorio='data', nombre='embeddings', umbral_registros=4096, umbral_segundos=300,
+                 compresion=None, factor_reescalado=10, indice='auto', umbral_ann=50000, ef_busqueda=64, nprobe=16):
+        if compresion not in COMPRESIONES:
+            raise ValueError(f'Compresión no soportada: {compresion}')
+        self.directorio = directorio
+        self.nombre = nombre
+        self.ruta_manifiesto = os.path.join(directorio, f'{nombre}.json')
+        self.umbral_registros = umbral_registros
+        self.umbral_segundos = umbral_segundos
+        self.compresion = compresion
+        self.factor_reescalado = factor_reescalado
+        self.backend_ann = resolver_backend(indice)
+        self.umbral_ann = umbral_ann
+        self.ef_busqueda = ef_busqueda
+        self.nprobe = nprobe
+        self._lock = threading.RLock()
+        # Base: última generación compactada, memory-mapped desde disco
+        self._base = None
+        self._base_ids = np.empty(0, dtype=np.int64)
+        self._base_ordenados = np.empty(0, dtype=np.int64)
+        self._base_comprimida = None
+        self._base_escalas = None
+        # Delta: filas agregadas desde la última compactación, en RAM
+        self._delta_vectores = []
+        self._delta_ids = []
+        self._delta_matriz = None
+        # Solo los IDs del delta; los de la base se consultan en _base_ordenados
+        self._ids_conocidos = set()
+        self._indice_faiss = None
+        self._indice_ann = None
+        self._construyendo_ann = False
+        self._hilo_ann = None
+        self._ann_guardado = 0
+        self._generacion = 0
+        self._segmento = None
+        self._numero_segmento = 0
+        self._registros_segmento = 0
+        self._inicio_segmento = time.time()
+        self._segmentos_cerrados = []
+        self._lock_compactacion = threading.Lock()
+        self.cargar()
+        self._preparar_ann()
+
+    @property
+    def dimension(self):
+        if self._base is not None:
+            return self._base.shape[1]
+        if self._delta_vectores:
+            return self._delta_vectores[0].shape[0]
+        return None
+
+    def __len__(self):
+        return len(self._base_ids) + len(self._delta_ids)
+
+    def __contains__(self, id_recuerdo):
+        return bool(self.contiene([id_recuerdo])[0])
+
+    def contiene(self, ids):
+        """Devuelve un array booleano: True para cada ID que ya está en el almacén."""
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        with self._lock:
+            resultado = self._en_base(ids)
+            if self._ids_conocidos:
+                resultado |= np.fromiter((i in self._ids_conocidos for i in ids.tolist()), dtype=bool, count=len(ids))
+        return resultado
+
+    def _en_base(self, ids):
+        ordenados = self._base_ordenados
+        if not len(ordenados) or not len(ids):
+            return np.zeros(len(ids), dtype=bool)
+        posiciones = np.searchsorted(ordenados, ids)
+        posiciones[posiciones == len(ordenados)] = 0
+        return ordenados[posiciones] == ids
+
+    def ids(self):
+        """Devuelve todos los IDs almacenados, en orden de inserción."""
+        with self._lock:
+            return np.concatenate([self._base_ids, np.asarray(self._delta_ids, dtype=np.int64)])
+
+    def _ruta_generacion(self, tipo, generacion):
+        return os.path.join(self.directorio, f'{self.nombre}_{tipo}.{generacion}.npy')
+
+    def _ruta_segmento(self, numero):
+        return os.path.join(self.directorio, f'{self.nombre}_segmento.{numero:06d}.log')
+
+    def _tipos_comprimidos(self):
+        if self.compresion == 'int8':
+            return ('int8', 'escalas')
+        if self.compresion == 'float16':
+            return ('float16',)
+        return ()
+
+    def cargar(self):
+        """Abre la matriz principal memory-mapped y reproduce los segmentos pendientes."""
+        with self._lock:
+            if os.path.exists(self.ruta_manifiesto):
+                try:
+                    with open(self.ruta_manifiesto, 'r', encoding='utf-8') as f:
+                        manifiesto = json.load(f)
+                    generacion = manifiesto['generacion']
+                    vectores = np.load(self._ruta_generacion('vectores', generacion), mmap_mode='r')
+                    ids = np.load(self._ruta_generacion('ids', generacion))
+                    if vectores.ndim != 2 or len(vectores) != len(ids):
+                        raise ValueError('matriz e IDs con tamaños distintos')
+                    self._base = vectores
+                    self._base_ids = ids.astype(np.int64, copy=False)
+                    self._generacion = generacion
+                    self._base_ordenados = self._cargar_ordenados()
+                    self._cargar_base_comprimida()
+                except (OSError, ValueError, KeyError) as e:
+                    print(f'[Embeddings] Error al cargar el almacén vectorial: {e}. Se reconstruirá desde los segmentos.')
+            self._limpiar_generaciones()
+            segmentos = sorted(glob.glob(os.path.join(self.directorio, f'{self.nombre}_segmento.*.log')))
+            for ruta in segmentos:
+                self._reproducir_segmento(ruta)
+            self._segmentos_cerrados = segmentos
+            numeros = [int(re.search(r'\.(\d+)\.log$', s).group(1)) for s in segmentos]
+            self._numero_segmento = max(numeros, default=0) + 1
+
+    def _cargar_ordenados(self):
+        """Abre los IDs ordenados de la generación actual; si faltan (almacén anterior), los genera."""
+        ruta = self._ruta_generacion('ordenados', self._generacion)
+        if os.path.exists(ruta):
+            ordenados = np.load(ruta, mmap_mode='r')
+            if len(ordenados) == len(self._base_ids):
+                return ordenados
+        ordenados = np.sort(self._base_ids)
+        self._escribir_atomico(ruta, ordenados)
+        return ordenados
+
+    def _cargar_base_comprimida(self):
+        """Abre la copia comprimida de la generación actual; si no existe, la genera una vez."""
+        if not self.compresion or self._base is None:
+            return
+        rutas = [self._ruta_generacion(tipo, self._generacion) for tipo in self._tipos_comprimidos()]
+        if not all(os.path.exists(r) for r in rutas):
+            print(f'[Embeddings] Generando la copia {self.compresion} del almacén vectorial...')
+            self._escribir_comprimida(self._generacion, [self._base])
+        self._base_comprimida = np.load(rutas[0], mmap_mode='r')
+        self._base_escalas = np.load(rutas[1]) if self.compresion == 'int8' else None
+
+    def _reproducir_segmento(self, ruta):
+        """Reaplica los registros de un segmento; descarta un registro final incompleto."""
+        with open(ruta, 'rb') as f:
+            datos = f.read()
+        posicion = 0
+        while posicion + _CABECERA.size <= len(datos):
+            id_recuerdo, dimension = _CABECERA.unpack_from(datos, posicion)
+            fin = posicion + _CABECERA.size + dimension * 4
+            if fin > len(datos):
+                break
+            vector = np.frombuffer(datos, dtype=np.float32, count=dimension, offset=posicion + _CABECERA.size)
+            self._agregar_en_memoria([id_recuerdo], vector[None, :])
+            posicion = fin
+        if posicion < len(datos):
+            print(f'[Embeddings] Segmento {os.path.basename(ruta)} truncado tras un cierre inesperado.')
+            with open(ruta, 'r+b') as f:
+                f.truncate(posicion)
+
+    def _limpiar_generaciones(self):
+        """Borra archivos de generaciones antiguas que ya no referencia el manifiesto."""
+        for tipo in _TIPOS_GENERACION:
+            for ruta in glob.glob(os.path.join(self.directorio, f'{self.nombre}_{tipo}.*.npy*')):
+                if ruta != self._ruta_generacion(tipo, self._generacion):
+                    try:
+                        os.remove(ruta)
+                    except OSError:
+                        pass  # En Windows puede seguir mapeado; se borrará en el próximo arranque
+
+    def guardar(self):
+        """Fusiona todos los segmentos con la matriz principal de forma síncrona.
+
+        Si el índice ANN se está construyendo, espera a que termine para guardarlo también.
+        """
+        with self._lock:
+            self._rotar_segmento()
+        self._compactar()
+        hilo = self._hilo_ann
+        if hilo is not None and hilo.is_alive():
+            print(f'[Embeddings] Esperando a que termine el índice {self.backend_ann} para guardarlo...')
+            hilo.join()
+        self._guardar_ann()
+
+    def agregar(self, ids, vectores):
+        """Agrega vectores con sus IDs anexándolos al segmento activo. Los IDs ya presentes se ignoran."""
+        vectores = np.asarray(vectores, dtype=np.float32)
+        if vectores.ndim == 1:
+            vectores = vectores[None, :]
+        with self._lock:
+            ids_nuevos, vectores = self._agregar_en_memoria(ids, vectores)
+            if not len(ids_nuevos):
+                return 0
+            self._escribir_segmento(ids_nuevos, vectores)
+            if self._requiere_compactacion():
+                self._rotar_segmento()
+                threading.Thread(target=self._compactar, daemon=True).start()
+            self._preparar_ann()
+            return len(ids_nuevos)
+
+    def _agregar_en_memoria(self, ids, vectores):
+        ids = np.asarray(ids, dtype=np.int64).reshape(-1)
+        nuevos = [i for i in np.flatnonzero(~self._en_base(ids)).tolist() if ids[i] not in self._ids_conocidos]
+        if not nuevos:
+            return [], vectores[:0]
+        vectores = self._normalizar(vectores[nuevos])
+        ids_nuevos = ids[nuevos]
+        self._delta_vectores.extend(vectores)
+        self._delta_ids.extend(ids_nuevos.tolist())
+        self._ids_conocidos.update(ids_nuevos.tolist())
+        if self._indice_faiss is not None:
+            self._indice_faiss.add_with_ids(vectores, ids_nuevos)
+        if self._indice_ann is not None:
+            self._indice_ann.agregar(ids_nuevos, vectores)
+        return ids_nuevos, vectores
+
+    def _matriz_delta(self):
+        """Devuelve las filas del delta como una sola matriz (se recalcula solo si cambió)."""
+        if not self._delta_vectores:
+            return None
+        if self._delta_matriz is None or len(self._delta_matriz) != len(self._delta_vectores):
+            self._delta_matriz = np.vstack(self._delta_vectores).astype(np.float32, copy=False)
+        return self._delta_matriz
+
+    def _escribir_segmento(self, ids, vectores):
+        if self._segmento is None:
+            os.makedirs(self.directorio, exist_ok=True)
+            self._segmento = open(self._ruta_segmento(self._numero_segmento), 'ab')
+            self._registros_segmento = 0
+            self._inicio_segmento = time.time()
+        partes = []
+        for id_recuerdo, vector in zip(ids, vectores):
+            partes.append(_CABECERA.pack(int(id_recuerdo), len(vector)))
+            partes.append(vector.tobytes())
+        self._segmento.write(b''.join(partes))
+        self._segmento.flush()
+        self._registros_segmento += len(ids)
+
+    def _requiere_compactacion(self):
+        if self._lock_compactacion.locked():
+            return False
+        antiguedad = time.time() - self._inicio_segmento
+        return self._registros_segmento >= self.umbral_registros or antiguedad >= self.umbral_segundos
+
+    def _rotar_segmento(self):
+        """Cierra el segmento activo; las escrituras siguientes van a uno nuevo."""
+        if self._segmento is None:
+            return
+        self._segmento.close()
+        self._segmentos_cerrados.append(self._ruta_segmento(self._numero_segmento))
+        self._segmento = None
+        self._numero_segmento += 1
+
+    def _compactar(self):
+        """Escribe una nueva generación de la matriz principal y borra los segmentos ya fusionados."""
+        with self._lock_compactacion:
+            try:
+                self._compactar_generacion()
+            except Exception as e:
+                print(f'[Embeddings] Error al compactar el almacén vectorial: {e}')
+
+    def _compactar_generacion(self):
+        with self._lock:
+            base, base_ids = self._base, self._base_ids
+            base_comprimida, base_escalas = self._base_comprimida, self._base_escalas
+            delta = self._matriz_delta()
+            n_delta = len(self._delta_ids)
+            delta_ids = np.asarray(self._delta_ids[:n_delta], dtype=np.int64)
+            segmentos = list(self._segmentos_cerrados)
+            generacion = self._generacion + 1
+        if n_delta == 0:
+            if os.path.exists(self.ruta_manifiesto):
+                self._borrar_segmentos(segmentos)
+            return
+        # La nueva generación se escribe fuera del lock y por bloques: la base sigue en disco
+        os.makedirs(self.directorio, exist_ok=True)
+        bloques = [b for b in (base, delta) if b is not None]
+        self._escribir_bloques(self._ruta_generacion('vectores', generacion), bloques, np.float32)
+        ids_generacion = np.concatenate([base_ids, delta_ids])
+        self._escribir_atomico(self._ruta_generacion('ids', generacion), ids_generacion)
+        self._escribir_atomico(self._ruta_generacion('ordenados', generacion), np.sort(ids_generacion))
+        del ids_generacion
+        if self.compresion:
+            if base_comprimida is not None:
+                self._escribir_comprimida(generacion, [delta], base_comprimida, base_escalas)
+            else:
+                self._escribir_comprimida(generacion, bloques)
+        temporal = self.ruta_manifiesto + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump({
+                'generacion': generacion,
+                'registros': len(base_ids) + n_delta,
+                'dimension': delta.shape[1],
+                'compresion': self.compresion
+            }, f)
+        os.replace(temporal, self.ruta_manifiesto)
+        del base, base_comprimida, bloques
+        with self._lock:
+            # Los IDs no cambian, así que el índice faiss sigue siendo válido
+            self._base = np.load(self._ruta_generacion('vectores', generacion), mmap_mode='r')
+            self._base_ids = np.load(self._ruta_generacion('ids', generacion))
+            self._base_ordenados = np.load(self._ruta_generacion('ordenados', generacion), mmap_mode='r')
+            self._generacion = generacion
+            self._cargar_base_comprimida()
+            del self._delta_vectores[:n_delta]
+            del self._delta_ids[:n_delta]
+            self._ids_conocidos.difference_update(delta_ids.tolist())
+            self._delta_matriz = None
+        self._borrar_segmentos(segmentos)
+        self._limpiar_generaciones()
+
+    def _borrar_segmentos(self, segmentos):
+        with self._lock:
+            self._segmentos_cerrados = [s for s in self._segmentos_cerrados if s not in segmentos]
+        for ruta in segmentos:
+            try:
+                os.remove(ruta)
+            except OSError:
+                pass
+
+    def _escribir_comprimida(self, generacion, bloques, previa=None, escalas_previas=None):
+        """Escribe la copia comprimida de una generación: la parte previa ya comprimida más los bloques nuevos."""
+        partes = [previa] if previa is not None else []
+        escalas = [escalas_previas] if escalas_previas is not None else []
+        for bloque in bloques:
+            for inicio in range(0, len(bloque), _FILAS_POR_BLOQUE):
+                parte = np.asarray(bloque[inicio:inicio + _FILAS_POR_BLOQUE], dtype=np.float32)
+                comprimida, escala = cuantizar(parte, self.compresion)
+                partes.append(comprimida)
+                if escala is not None:
+                    escalas.append(escala)
+        tipo = self._tipos_comprimidos()[0]
+        self._escribir_bloques(self._ruta_generacion(tipo, generacion), partes, partes[0].dtype)
+        if self.compresion == 'int8':
+            self._escribir_atomico(self._ruta_generacion('escalas', generacion), np.concatenate(escalas))
+
+    @staticmethod
+    def _escribir_bloques(ruta, bloques, dtype):
+        """Escribe la concatenación de varias matrices en un .npy sin juntarlas en RAM."""
+        temporal = ruta + '.tmp'
+        filas = sum(len(b) for b in bloques)
+        destino = np.lib.format.open_memmap(temporal, mode='w+', dtype=dtype, shape=(filas, bloques[0].shape[1]))
+        posicion = 0
+        for bloque in bloques:
+            for inicio in range(0, len(bloque), _FILAS_POR_BLOQUE):
+                parte = bloque[inicio:inicio + _FILAS_POR_BLOQUE]
+                destino[posicion:posicion + len(parte)] = parte
+                posicion += len(parte)
+        destino.flush()
+        del destino  # En Windows no se puede renombrar un archivo mapeado
+        os.replace(temporal, ruta)
+
+    @staticmethod
+    def _escribir_atomico(ruta, matriz):
+        temporal = ruta + '.tmp'
+        with open(temporal, 'wb') as f:
+            np.save(f, matriz)
+        os.replace(temporal, ruta)
+
+    def buscar(self, consulta, k=5):
+        """Devuelve una lista de (id, similitud coseno) ordenada de mayor a menor."""
+        with self._lock:
+            if len(self) == 0:
+                return []
+            consulta = self._normalizar(np.asarray(consulta, dtype=np.float32).reshape(1, -1))[0]
+            k = min(k, len(self))
+            if self._indice_ann is not None:
+                return self._indice_ann.buscar(consulta, k)
+            if self.compresion:
+                return self._buscar_comprimido(consulta, k)
+            if faiss is not None:
+                return self._buscar_faiss(consulta, k)
+            return self._buscar_exacto(consulta, k)
+
+    def _buscar_exacto(self, consulta, k):
+        """Búsqueda exhaustiva en float32 sobre la base y el delta."""
+        resultados = []
+        if self._base is not None and len(self._base_ids):
+            puntajes = np.empty(len(self._base_ids), dtype=np.float32)
+            for inicio in range(0, len(puntajes), _FILAS_POR_BLOQUE):
+                bloque = self._base[inicio:inicio + _FILAS_POR_BLOQUE]
+                puntajes[inicio:inicio + len(bloque)] = bloque @ consulta
+            candidatos = _top_k(puntajes, k)
+            resultados.extend(zip(self._base_ids[candidatos].tolist(), puntajes[candidatos].tolist()))
+        resultados.extend(self._buscar_delta(consulta, k))
+        resultados.sort(key=lambda r: r[1], reverse=True)
+        return resultados[:k]
+
+    def _buscar_delta(self, consulta, k):
+        delta = self._matriz_delta()
+        if delta is None:
+            return []
+        puntajes = delta @ consulta
+        return [(self._delta_ids[i], float(puntajes[i])) for i in _top_k(puntajes, k)]
+
+    def _buscar_comprimido(self, consulta, k, reescalar=True):
+        """Pasada aproximada sobre la copia comprimida y reescalado exacto de los mejores candidatos."""
+        resultados = []
+        if self._base_comprimida is not None and len(self._base_ids):
+            aproximados = _puntajes_aproximados(self._base_comprimida, self._base_escalas, consulta)
+            if reescalar:
+                # Ordenar los candidatos hace que la lectura del mmap float32 sea secuencial
+                candidatos = np.sort(_top_k(aproximados, min(len(aproximados), k * self.factor_reescalado)))
+                exactos = np.asarray(self._base[candidatos], dtype=np.float32) @ consulta
+                resultados.extend(zip(self._base_ids[candidatos].tolist(), exactos.tolist()))
+            else:
+                candidatos = _top_k(aproximados, k)
+                resultados.extend(zip(self._base_ids[candidatos].tolist(), aproximados[candidatos].tolist()))
+        resultados.extend(self._buscar_delta(consulta, k))
+        resultados.sort(key=lambda r: r[1], reverse=True)
+        return resultados[:k]
+
+    def _buscar_faiss(self, consulta, k):
+        if self._indice_faiss is None:
+            indice = faiss.IndexIDMap(faiss.IndexFlatIP(self.dimension))
+            if self._base is not None and len(self._base_ids):
+                indice.add_with_ids(np.ascontiguousarray(self._base, dtype=np.float32), self._base_ids)
+            delta = self._matriz_delta()
+            if delta is not None:
+                indice.add_with_ids(delta, np.asarray(self._delta_ids, dtype=np.int64))
+            self._indice_faiss = indice
+        D, I = self._indice_faiss.search(consulta[None, :], k)
+        return [(int(idx), float(d)) for d, idx in zip(D[0], I[0]) if idx != -1]
+
+    def _ruta_ann(self):
+        return os.path.join(self.directorio, f'{self.nombre}_ann.{self.backend_ann}')
+
+    def _preparar_ann(self):
+        """Abre el índice ANN guardado o lanza su construcción al superar el umbral."""
+        if self.backend_ann is None or self._indice_ann is not None or self._construyendo_ann:
+            return
+        if len(self) < self.umbral_ann:
+            return
+        with self._lock:
+            if self._abrir_ann_guardado():
+                return
+            self._construyendo_ann = True
+            self._hilo_ann = threading.Thread(target=self.construir_indice_ann, name='indice-ann', daemon=True)
+            self._hilo_ann.start()
+
+    def _abrir_ann_guardado(self):
+        ruta_meta = self._ruta_ann() + '.json'
+        if not os.path.exists(ruta_meta):
+            return False
+        try:
+            with open(ruta_meta, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta['dimension'] != self.dimension or meta['registros'] > len(self):
+                return False
+            indice = crear_indice_ann(self.backend_ann, self.dimension, self.ef_busqueda, self.nprobe, ruta=self._ruta_ann())
+            # El índice guardado cubre un prefijo de los IDs; se agregan los posteriores
+            for ids, vectores in self._recorrer(self._partes(), meta['registros']):
+                indice.agregar(ids, vectores)
+        except Exception as e:
+            print(f'[Embeddings] No se pudo abrir el índice {self.backend_ann} guardado: {e}. Se reconstruirá.')
+            return False
+        self._indice_ann = indice
+        self._indice_faiss = None
+        self._ann_guardado = meta['registros']
+        return True
+
+    def construir_indice_ann(self):
+        """Construye el índice ANN con todos los vectores actuales. Bloquea hasta terminar."""
+        with self._lock:
+            self._construyendo_ann = True
+            partes = self._partes()
+            total = len(self)
+            dimension = self.dimension
+        try:
+            inicio = time.time()
+            indice = crear_indice_ann(self.backend_ann, dimension, self.ef_busqueda, self.nprobe)
+            if indice.requiere_entrenamiento:
+                rng = np.random.default_rng(0)
+                filas = np.sort(rng.choice(total, size=min(total, 100000), replace=False))
+                indice.entrenar(self._filas(partes, filas), total)
+            for ids, vectores in self._recorrer(partes):
+                indice.agregar(ids, vectores)
+            with self._lock:
+                # Lo insertado durante la construcción se agrega antes de publicar el índice
+                for ids, vectores in self._recorrer(self._partes(), total):
+                    indice.agregar(ids, vectores)
+                self._indice_ann = indice
+                self._indice_faiss = None
+            print(f'[Embeddings] Índice {self.backend_ann} listo con {len(indice)} vectores en {time.time() - inicio:.1f}s.')
+        except Exception as e:
+            print(f'[Embeddings] Error al construir el índice {self.backend_ann}: {e}. Se seguirá con búsqueda exacta.')
+            self.backend_ann = None
+        finally:
+            self._construyendo_ann = False
+
+    def ajustar_busqueda(self, ef_busqueda=None, nprobe=None):
+        """Cambia efSearch (HNSW) o nprobe (IVF-PQ) del índice ANN."""
+        with self._lock:
+            self.ef_busqueda = ef_busqueda or self.ef_busqueda
+            self.nprobe = nprobe or self.nprobe
+            if self._indice_ann is not None:
+                self._indice_ann.ajustar(ef_busqueda=ef_busqueda, nprobe=nprobe)
+
+    def _guardar_ann(self):
+        """Escribe el índice ANN a disco si cambió desde la última vez."""
+        with self._lock:
+            indice = self._indice_ann
+            if indice is None or len(indice) == self._ann_guardado:
+                return
+            try:
+                temporal = self._ruta_ann() + '.tmp'
+                indice.guardar(temporal)
+                os.replace(temporal, self._ruta_ann())
+                with open(self._ruta_ann() + '.json.tmp', 'w', encoding='utf-8') as f:
+                    json.dump({'registros': len(indice), 'dimension': self.dimension}, f)
+                os.replace(self._ruta_ann() + '.json.tmp', self._ruta_ann() + '.json')
+                self._ann_guardado = len(indice)
+            except Exception as e:
+                print(f'[Embeddings] No se pudo guardar el índice {self.backend_ann}: {e}')
+
+    def _partes(self):
+        """Foto de (ids, vectores) de la base y el delta, en orden de inserción."""
+        partes = []
+        if self._base is not None and len(self._base_ids):
+            partes.append((self._base_ids, self._base))
+        delta = self._matriz_delta()
+        if delta is not None:
+            partes.append((np.asarray(self._delta_ids[:len(delta)], dtype=np.int64), delta))
+        return partes
+
+    @staticmethod
+    def _recorrer(partes, desde=0):
+        """Recorre las partes por bloques, saltando las primeras `desde` filas."""
+        for ids, vectores in partes:
+            if desde >= len(ids):
+                desde -= len(ids)
+                continue
+            for inicio in range(desde, len(ids), _FILAS_POR_BLOQUE):
+                fin = inicio + _FILAS_POR_BLOQUE
+                yield ids[inicio:fin], np.asarray(vectores[inicio:fin], dtype=np.float32)
+            desde = 0
+
+    @staticmethod
+    def _filas(partes, filas):
+        """Extrae filas por posición global (ordenadas) de un conjunto de partes."""
+        resultado, desplazamiento = [], 0
+        for ids, vectores in partes:
+            locales = filas[(filas >= desplazamiento) & (filas < desplazamiento + len(ids))] - desplazamiento
+            resultado.append(np.asarray(vectores[locales], dtype=np.float32))
+            desplazamiento += len(ids)
+        return np.concatenate(resultado)
+
+    def informe_recall(self, k=10, muestras=100, consultas=None, semilla=0):
+        """Mide el recall@k de la búsqueda comprimida frente a la búsqueda exacta en float32.
+
+        Sin consultas explícitas usa vectores almacenados con algo de ruido.
+        """
+        if not self.compresion:
+            raise ValueError('El almacén no tiene compresión activa')
+        with self._lock:
+            if len(self) == 0:
+                return {}
+            if consultas is None:
+                rng = np.random.default_rng(semilla)
+                todos = np.concatenate([b for b in (self._base, self._matriz_delta()) if b is not None])
+                filas = np.sort(rng.choice(len(todos), size=min(muestras, len(todos)), replace=False))
+                consultas = todos[filas] + rng.normal(scale=0.05, size=(len(filas), todos.shape[1]))
+            consultas = self._normalizar(np.asarray(consultas, dtype=np.float32))
+            k = min(k, len(self))
+            recall, recall_sin_reescalado = [], []
+            for consulta in consultas:
+                exactos = {i for i, _ in self._buscar_exacto(consulta, k)}
+                reescalados = {i for i, _ in self._buscar_comprimido(consulta, k)}
+                aproximados = {i for i, _ in self._buscar_comprimido(consulta, k, reescalar=False)}
+                recall.append(len(exactos & reescalados) / k)
+                recall_sin_reescalado.append(len(exactos & aproximados) / k)
+            bytes_comprimidos = 0
+            if self._base_comprimida is not None:
+                bytes_comprimidos = self._base_comprimida.nbytes
+                if self._base_escalas is not None:
+                    bytes_comprimidos += self._base_escalas.nbytes
+            return {
+                'compresion': self.compresion,
+                'k': k,
+                'consultas': len(consultas),
+                'factor_reescalado': self.factor_reescalado,
+                'recall': float(np.mean(recall)),
+                'recall_sin_reescalado': float(np.mean(recall_sin_reescalado)),
+                'bytes_comprimidos': int(bytes_comprimidos),
+                'bytes_float32': int(self._base.nbytes) if self._base is not None else 0
+            }
+
+    @staticmethod
+    def _normalizar(vectores):
+        normas = np.linalg.norm(vectores, axis=1, keepdims=True)
+        normas[normas == 0] = 1.0
+        return np.ascontiguousarray(vectores / normas, dtype=np.float32)
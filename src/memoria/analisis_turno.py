@@ -0,0 +1,25 @@
+"""
+Análisis por turno para Sassy.
+Guarda el embedding de un texto y lo calcula una sola vez por turno, en lugar
+de que búsqueda y almacenamiento lo recalculen cada uno.
+"""
+
+import threading
+
+
+class AnalisisTurno:
+    def __init__(self, texto, embeddings=None):
+        self.texto = texto
+        self._embeddings = embeddings
+        self._embedding = None
+        self._lock = threading.Lock()
+
+    @property
+    def embedding(self):
+        """Embedding del texto, calculado la primera vez que se pide. None mientras el modelo carga."""
+        if self._embedding is None and self._embeddings is not None and self._embeddings.model is not None:
+            with self._lock:
+                if self._embedding is None:
+                    self._embedding = self._embeddings.codificar([self.texto])[0]
+        return self._embedding
+
@@ -0,0 +1,78 @@
+"""
+Caché de resultados de búsqueda de recuerdos para Sassy.
+Guarda los últimos resultados de buscar_recuerdos por (consulta normalizada,
+límite, tipo) junto con la generación de escritura de la memoria: cualquier
+recuerdo nuevo sube la generación y deja obsoletas todas las entradas.
+Búsquedas idénticas simultáneas esperan a la primera en vez de repetirla.
+"""
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+
+def normalizar_consulta(consulta):
+    """Minúsculas y espacios simples: "Hola  Sassy" y "hola sassy" comparten entrada."""
+    return ' '.join(consulta.lower().split())
+
+
+class CacheConsultas:
+    def __init__(self, capacidad=256):
+        self.capacidad = capacidad
+        # clave -> (generación, resultados), en orden de uso (LRU)
+        self._entradas = OrderedDict()
+        # (clave, generación) -> Future de la búsqueda en curso
+        self._en_curso = {}
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def obtener(self, clave, generacion, calcular):
+        """Devuelve los resultados de `clave` para `generacion`, llamando a `calcular()` solo si hace falta."""
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and entrada[0] == generacion:
+                self._entradas.move_to_end(clave)
+                self.aciertos += 1
+                return self._copiar(entrada[1])
+            futuro = self._en_curso.get((clave, generacion))
+            propio = futuro is None
+            if propio:
+                futuro = Future()
+                self._en_curso[(clave, generacion)] = futuro
+                self.fallos += 1
+            else:
+                self.aciertos += 1
+        if not propio:
+            return self._copiar(futuro.result())
+        try:
+            resultados = calcular()
+        except Exception as e:
+            futuro.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._en_curso.pop((clave, generacion), None)
+        with self._lock:
+            actual = self._entradas.get(clave)
+            # No pisar una entrada más nueva calculada mientras tanto
+            if actual is None or actual[0] <= generacion:
+                self._entradas[clave] = (generacion, resultados)
+                self._entradas.move_to_end(clave)
+                while len(self._entradas) > self.capacidad:
+                    self._entradas.popitem(last=False)
+        futuro.set_result(resultados)
+        return self._copiar(resultados)
+
+    @staticmethod
+    def _copiar(resultados):
+        # Cada llamador recibe sus propios dicts, y sus propias listas ('categorias') y dicts ('contexto'):
+        # modificarlos no altera la caché
+        return [
+            {clave: valor.copy() if isinstance(valor, (list, dict)) else valor for clave, valor in r.items()}
+            for r in resultados
+        ]
+
+    def limpiar(self):
+        with self._lock:
+            self._entradas.clear()
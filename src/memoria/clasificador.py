@@ -0,0 +1,113 @@
+"""
+Clasificador de recuerdos para Sassy.
+Reúne en una sola expresión regular compilada (un trie de literales) las
+palabras clave que asignan tipo y categorías a un recuerdo y los inicios de los
+patrones de datos personales (nombre, ciudad, cumpleaños...). El texto se pasa a
+minúsculas una vez y se recorre en una sola pasada, en lugar de un `in` por
+palabra clave y un `re.search` por patrón.
+"""
+
+import re
+
+# (palabras clave, tipo, categoría). Si varias reglas coinciden, gana el tipo de la última
+REGLAS = [
+    (["me llamo", "mi nombre es", "soy "], "dato_usuario", "nombre"),
+    (["vivo en", "ciudad", "país", "pais"], "dato_usuario", "ubicacion"),
+    (["cumpleaños", "nací", "naci", "fecha de nacimiento"], "dato_usuario", "cumpleaños"),
+    (["me gusta", "prefiero", "odio", "amo", "favorito"], "preferencia", "gustos"),
+    (["recuerda que", "no olvides que"], "recordatorio", "recordatorio"),
+    (["comando", "ejecuta", "haz", "abre", "cierra"], "comando", "comando"),
+]
+
+# (patrón, clave del dato). Si varios coinciden, gana el primero de la lista
+PATRONES_DATOS = [
+    (r"mi nombre es ([\wáéíóúüñ]+)", "nombre"),
+    (r"me llamo ([\wáéíóúüñ]+)", "nombre"),
+    (r"nací el ([\w\d/\- ]+)", "cumpleaños"),
+    (r"mi cumpleaños es ([\w\d/\- ]+)", "cumpleaños"),
+    (r"vivo en ([\wáéíóúüñ ]+)", "ciudad"),
+    (r"soy de ([\wáéíóúüñ ]+)", "ciudad"),
+    (r"mi color favorito es ([\wáéíóúüñ]+)", "color_favorito"),
+    (r"mi comida favorita es ([\wáéíóúüñ ]+)", "comida_favorita")
+]
+
+
+def _regex_trie(literales):
+    """Une literales en una regex con los prefijos comunes factorizados (un trie).
+
+    Así el motor descarta cada posición mirando un carácter, en vez de probar cada alternativa.
+    """
+    trie = {}
+    for literal in literales:
+        nodo = trie
+        for caracter in literal:
+            nodo = nodo.setdefault(caracter, {})
+        nodo[''] = {}
+
+    def emitir(nodo):
+        ramas = [re.escape(c) + emitir(hijo) for c, hijo in sorted(nodo.items()) if c]
+        if not ramas:
+            return ''
+        expresion = ramas[0] if len(ramas) == 1 else f'(?:{"|".join(ramas)})'
+        return f'(?:{expresion})?' if '' in nodo else expresion
+
+    return emitir(trie)
+
+
+class ClasificadorRecuerdos:
+    def __init__(self, reglas=REGLAS, patrones_datos=PATRONES_DATOS):
+        self.reglas = reglas
+        self.patrones_datos = patrones_datos
+        # Cada literal disparador mapea a las acciones que activa: ('regla', j) o ('dato', i).
+        # Los patrones de datos empiezan con un literal ("me llamo "...), que sirve de disparador
+        disparadores = {}
+        for j, (claves, _, _) in enumerate(reglas):
+            for clave in claves:
+                disparadores.setdefault(clave, []).append(('regla', j))
+        self._datos = []
+        for i, (patron, _) in enumerate(patrones_datos):
+            disparadores.setdefault(patron.split('(', 1)[0], []).append(('dato', i))
+            self._datos.append(re.compile(patron))
+        self._patron = re.compile(_regex_trie(disparadores))
+        # Varios literales pueden empezar en la misma posición ("soy " y "soy de ")
+        self._por_inicial = {}
+        for literal, acciones in disparadores.items():
+            self._por_inicial.setdefault(literal[0], []).append((literal, acciones))
+
+    def clasificar(self, texto, tipo="general", categorias=None):
+        """Devuelve (tipo, categorías, (clave, valor) del dato personal o (None, None))."""
+        texto = texto.lower()
+        reglas = set()
+        dato = None
+        m = self._patron.search(texto)
+        while m is not None:
+            posicion = m.start()
+            for literal, acciones in self._por_inicial[texto[posicion]]:
+                if not texto.startswith(literal, posicion):
+                    continue
+                for clase, indice in acciones:
+                    if clase == 'regla':
+                        reglas.add(indice)
+                    elif dato is None or indice < dato[0]:
+                        encontrado = self._datos[indice].match(texto, posicion)
+                        if encontrado:
+                            dato = (indice, encontrado.group(1))
+            # Se reanuda en la posición siguiente y no al final de la coincidencia:
+            # las palabras clave pueden solaparse (p. ej. "amo" dentro de "me llamo")
+            m = self._patron.search(texto, posicion + 1)
+        categorias = list(categorias or [])
+        for j in sorted(reglas):
+            _, tipo_regla, categoria = self.reglas[j]
+            tipo = tipo_regla
+            if categoria not in categorias:
+                categorias.append(categoria)
+        if dato is None:
+            return tipo, categorias, (None, None)
+        return tipo, categorias, (self.patrones_datos[dato[0]][1], dato[1].strip())
+
+    def extraer_dato(self, texto):
+        """Devuelve (clave, valor) del primer dato personal reconocido, o (None, None)."""
+        return self.clasificar(texto)[2]
+
+
+clasificador = ClasificadorRecuerdos()
@@ -0,0 +1,76 @@
+"""
+Capa de conexiones SQLite para la memoria de Sassy.
+Mantiene una conexión persistente por hilo en modo WAL, con pragmas ajustados
+y caché de sentencias preparadas, en lugar de abrir una conexión por consulta.
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# Pragmas aplicados a cada conexión nueva
+PRAGMAS = (
+    "PRAGMA journal_mode=WAL",           # Lectores concurrentes no esperan a los escritores
+    "PRAGMA synchronous=NORMAL",         # En WAL solo hace fsync en los checkpoints
+    "PRAGMA cache_size=-16000",          # ~16 MB de caché de páginas por conexión
+    "PRAGMA mmap_size=268435456",        # Hasta 256 MB de lecturas vía mmap
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+
+# Sentencias preparadas que se conservan por conexión (se reutilizan por texto SQL)
+SENTENCIAS_EN_CACHE = 256
+
+
+class ConexionesSQLite:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        directorio = os.path.dirname(db_path)
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+    def conexion(self):
+        """Devuelve la conexión del hilo actual, creándola la primera vez."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # isolation_level=None: las lecturas no abren transacciones implícitas
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=5,
+                isolation_level=None,
+                cached_statements=SENTENCIAS_EN_CACHE
+            )
+            for pragma in PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+        return conn
+
+    def cursor(self):
+        """Cursor sobre la conexión del hilo, para lecturas."""
+        return self.conexion().cursor()
+
+    @contextmanager
+    def transaccion(self, inmediata=False):
+        """Agrupa escrituras en una transacción; confirma al salir o revierte si hay error.
+
+        Con inmediata=True toma el bloqueo de escritura al empezar (BEGIN IMMEDIATE).
+        """
+        conn = self.conexion()
+        c = conn.cursor()
+        c.execute("BEGIN IMMEDIATE" if inmediata else "BEGIN")
+        try:
+            yield c
+        except BaseException:
+            c.execute("ROLLBACK")
+            raise
+        else:
+            c.execute("COMMIT")
+
+    def cerrar(self):
+        """Cierra la conexión del hilo actual."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
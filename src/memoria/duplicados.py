@@ -0,0 +1,95 @@
+"""
+Detección de casi-duplicados para la memoria de Sassy.
+Calcula firmas MinHash sobre 5-gramas de caracteres del texto normalizado y
+las indexa por bandas (LSH) en SQLite, de modo que encontrar un recuerdo casi
+igual cuesta unas pocas búsquedas por clave en lugar de comparar con todos.
+Las firmas sobreviven a los reinicios porque viven en la misma base de datos.
+"""
+
+import re
+import unicodedata
+import zlib
+import numpy as np
+
+# Primo mayor que 2**32: las permutaciones son (a * x + b) mod PRIMO
+PRIMO = 4294967311
+
+
+class IndiceDuplicados:
+    def __init__(self, permutaciones=64, bandas=8, umbral=0.8, tamano_ngrama=5, minimo_ngramas=20, semilla=1):
+        # 8 bandas de 8 filas: el umbral efectivo del LSH ronda (1/8)**(1/8) ≈ 0.77
+        if permutaciones % bandas:
+            raise ValueError('permutaciones debe ser múltiplo de bandas')
+        self.permutaciones = permutaciones
+        self.bandas = bandas
+        self.filas_por_banda = permutaciones // bandas
+        self.umbral = umbral
+        self.tamano_ngrama = tamano_ngrama
+        # Con pocos n-gramas la estimación es ruidosa: solo cuentan las firmas idénticas
+        self.minimo_ngramas = minimo_ngramas
+        # Semilla fija: las firmas guardadas deben seguir siendo comparables entre ejecuciones
+        rng = np.random.default_rng(semilla)
+        self._a = rng.integers(1, 2 ** 32, size=permutaciones, dtype=np.uint64)
+        self._b = rng.integers(0, 2 ** 32, size=permutaciones, dtype=np.uint64)
+
+    @staticmethod
+    def normalizar(texto):
+        """Minúsculas, sin tildes ni puntuación y con espacios simples."""
+        texto = unicodedata.normalize('NFKD', texto.lower())
+        texto = ''.join(c for c in texto if not unicodedata.combining(c))
+        return ' '.join(re.sub(r'[^\w\s]', ' ', texto).split())
+
+    def firma(self, texto):
+        """Devuelve (firma MinHash, número de n-gramas) del texto."""
+        texto = self.normalizar(texto)
+        n = self.tamano_ngrama
+        ngramas = {texto[i:i + n] for i in range(max(1, len(texto) - n + 1))}
+        x = np.fromiter((zlib.crc32(g.encode('utf-8')) for g in ngramas), dtype=np.uint64, count=len(ngramas))
+        # a, b y x son menores que 2**32, así que a * x + b cabe en uint64
+        valores = (self._a[:, None] * x[None, :] + self._b[:, None]) % np.uint64(PRIMO)
+        return valores.min(axis=1), len(ngramas)
+
+    def _claves_bandas(self, firma):
+        return [
+            (banda, zlib.crc32(firma[banda * self.filas_por_banda:(banda + 1) * self.filas_por_banda].tobytes()))
+            for banda in range(self.bandas)
+        ]
+
+    def buscar(self, c, firma, ngramas, umbral=None):
+        """Devuelve (id, similitud estimada) del recuerdo más parecido por encima del umbral, o None.
+
+        `umbral` sustituye al del índice (1.0 = solo firmas idénticas).
+        """
+        candidatos = set()
+        # Una búsqueda por clave primaria por banda; un OR entre bandas haría un recorrido completo
+        for banda, clave in self._claves_bandas(firma):
+            candidatos.update(fila[0] for fila in c.execute(
+                "SELECT recuerdo_id FROM lsh_bandas WHERE banda = ? AND clave = ?", (banda, clave)
+            ))
+        candidatos = list(candidatos)
+        if not candidatos:
+            return None
+        if umbral is None:
+            umbral = 1.0 if ngramas < self.minimo_ngramas else self.umbral
+        mejor = None
+        for inicio in range(0, len(candidatos), 500):
+            parte = candidatos[inicio:inicio + 500]
+            filas = c.execute(
+                f"SELECT recuerdo_id, firma FROM lsh_firmas WHERE recuerdo_id IN ({','.join('?' * len(parte))})", parte
+            ).fetchall()
+            if not filas:
+                continue
+            firmas = np.frombuffer(b''.join(blob for _, blob in filas), dtype=np.uint64).reshape(len(filas), -1)
+            similitudes = (firmas == firma).mean(axis=1)
+            i = int(similitudes.argmax())
+            if similitudes[i] >= umbral and (mejor is None or similitudes[i] > mejor[1]):
+                mejor = (filas[i][0], float(similitudes[i]))
+        return mejor
+
+    def registrar(self, c, id_recuerdo, firma):
+        """Guarda la firma y sus bandas para un recuerdo."""
+        c.execute("INSERT OR REPLACE INTO lsh_firmas (recuerdo_id, firma) VALUES (?, ?)", (id_recuerdo, firma.tobytes()))
+        c.executemany(
+            "INSERT OR IGNORE INTO lsh_bandas (banda, clave, recuerdo_id) VALUES (?, ?, ?)",
+            [(banda, clave, id_recuerdo) for banda, clave in self._claves_bandas(firma)]
+        )
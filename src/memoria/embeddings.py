@@ -3,74 +3,272 @@ Módulo de embeddings y relaciones semánticas para Sassy.
 Utiliza sentence-transformers para generar embeddings semánticos.
 """
 
-import numpy as np
-from sentence_transformers import SentenceTransformer
-import faiss
+import hashlib
 import os
-import pickle
-from datetime import datetime
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import Future
+import numpy as np
+from .almacen_vectorial import AlmacenVectorial
+from .conexion import ConexionesSQLite
+
+class CacheEmbeddings:
+    """Caché de embeddings por (modelo, hash del texto normalizado).
+
+    Primer nivel: LRU acotado en memoria. Segundo nivel opcional: tabla SQLite
+    en disco que sobrevive a los reinicios, también LRU: la columna `creado`
+    guarda el último uso y los aciertos en disco la renuevan en la siguiente escritura.
+    """
+
+    def __init__(self, model_name, capacidad=4096, ruta_db=None, capacidad_disco=200000):
+        self.model_name = model_name
+        self.capacidad = capacidad
+        self.capacidad_disco = capacidad_disco
+        self.aciertos = 0
+        self.aciertos_disco = 0
+        self.fallos = 0
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        # Filas en disco, contadas una vez al abrir: escribir no necesita un COUNT(*)
+        self._filas_disco = 0
+        # Claves leídas de disco cuya fecha de uso aún no se renovó
+        self._usadas_disco = set()
+        if ruta_db:
+            self._db = ConexionesSQLite(ruta_db)
+            with self._db.transaccion(inmediata=True) as c:
+                c.execute('''CREATE TABLE IF NOT EXISTS cache_embeddings (
+                                clave BLOB PRIMARY KEY,
+                                vector BLOB,
+                                creado REAL
+                            )''')
+                c.execute("CREATE INDEX IF NOT EXISTS idx_cache_creado ON cache_embeddings(creado)")
+                self._filas_disco = c.execute("SELECT COUNT(*) FROM cache_embeddings").fetchone()[0]
+
+    @staticmethod
+    def normalizar(texto):
+        """Normaliza Unicode (NFC) y espacios; no cambia mayúsculas porque el modelo las distingue."""
+        return unicodedata.normalize('NFC', ' '.join(texto.split()))
+
+    def clave(self, texto):
+        return hashlib.sha1(f'{self.model_name}\0{self.normalizar(texto)}'.encode('utf-8')).digest()
+
+    def obtener(self, claves):
+        """Devuelve un dict clave -> vector con los aciertos de ambos niveles."""
+        encontrados = {}
+        faltantes = []
+        en_disco = 0
+        with self._lock:
+            for clave in dict.fromkeys(claves):
+                vector = self._lru.get(clave)
+                if vector is not None:
+                    self._lru.move_to_end(clave)
+                    encontrados[clave] = vector
+                else:
+                    faltantes.append(clave)
+            if faltantes and self._db is not None:
+                for inicio in range(0, len(faltantes), 500):
+                    parte = faltantes[inicio:inicio + 500]
+                    filas = self._db.cursor().execute(
+                        f"SELECT clave, vector FROM cache_embeddings WHERE clave IN ({','.join('?' * len(parte))})",
+                        parte
+                    ).fetchall()
+                    for clave, blob in filas:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        encontrados[clave] = vector
+                        self._recordar(clave, vector)
+                        self._usadas_disco.add(clave)
+                        en_disco += 1
+            self.aciertos += len(encontrados)
+            self.aciertos_disco += en_disco
+            self.fallos += len(faltantes) - en_disco
+        return encontrados
+
+    def guardar(self, pares):
+        """Guarda pares (clave, vector) en memoria y, si está activo, en disco."""
+        with self._lock:
+            for clave, vector in pares:
+                self._recordar(clave, vector)
+            if self._db is not None and pares:
+                ahora = time.time()
+                with self._db.transaccion() as c:
+                    if self._usadas_disco:
+                        c.executemany("UPDATE cache_embeddings SET creado = ? WHERE clave = ?", [(ahora, clave) for clave in self._usadas_disco])
+                        self._usadas_disco.clear()
+                    # El vector de una clave no cambia: las repetidas se ignoran y rowcount cuenta solo las nuevas
+                    c.executemany(
+                        "INSERT OR IGNORE INTO cache_embeddings (clave, vector, creado) VALUES (?, ?, ?)",
+                        [(clave, np.asarray(vector, dtype=np.float32).tobytes(), ahora) for clave, vector in pares]
+                    )
+                    self._filas_disco += max(c.rowcount, 0)
+                    if self._filas_disco > self.capacidad_disco:
+                        # Se baja al 90% para no desalojar en cada escritura
+                        exceso = self._filas_disco - int(self.capacidad_disco * 0.9)
+                        c.execute(
+                            "DELETE FROM cache_embeddings WHERE clave IN (SELECT clave FROM cache_embeddings ORDER BY creado LIMIT ?)",
+                            (exceso,)
+                        )
+                        self._filas_disco -= c.rowcount
+
+    def _recordar(self, clave, vector):
+        self._lru[clave] = vector
+        self._lru.move_to_end(clave)
+        while len(self._lru) > self.capacidad:
+            self._lru.popitem(last=False)
+
+    def estadisticas(self):
+        """Devuelve los contadores de aciertos y fallos."""
+        total = self.aciertos + self.fallos
+        return {
+            'aciertos': self.aciertos,
+            'aciertos_disco': self.aciertos_disco,
+            'fallos': self.fallos,
+            'tasa_aciertos': self.aciertos / total if total else 0.0,
+            'en_memoria': len(self._lru)
+        }
+
 
 class GestorEmbeddings:
-    def __init__(self, model_name='paraphrase-multilingual-MiniLM-L12-v2'):
-        self.model = SentenceTransformer(model_name)
-        self.index = None
-        self.recuerdos = []
-        self._cargar_o_crear_index()
-    
-    def _cargar_o_crear_index(self):
-        """Carga o crea el índice FAISS para búsqueda rápida."""
-        self.index_path = 'data/embeddings_index.pkl'
-        if not os.path.exists(self.index_path) or os.path.getsize(self.index_path) == 0:
-            print('[Embeddings] Archivo de índice no existe o está vacío. Creando nuevo índice.')
-            self.index = {}
-            with open(self.index_path, 'wb') as f:
-                pickle.dump(self.index, f)
-            return
+    def __init__(self, model_name='paraphrase-multilingual-MiniLM-L12-v2', directorio='data', cache_en_disco=True,
+                 modelo=None, **opciones_almacen):
+        """`modelo` permite inyectar un codificador propio (con método encode), por ejemplo en benchmarks.
+
+        `opciones_almacen` se pasan a AlmacenVectorial (compresion, indice, umbral_ann, ef_busqueda, nprobe).
+        """
+        self.model_name = model_name
+        self.model = modelo
+        self.almacen = AlmacenVectorial(directorio, **opciones_almacen)
+        ruta_cache = os.path.join(directorio, 'embeddings_cache.db') if cache_en_disco else None
+        self.cache = CacheEmbeddings(model_name, ruta_db=ruta_cache)
+        # El modelo se carga en segundo plano; `listo` se resuelve cuando está disponible
+        self.listo = Future()
+        self._lock_carga = threading.Lock()
+        self._escrituras_pendientes = []
+        if modelo is not None:
+            self.listo.set_result(True)
+        else:
+            threading.Thread(target=self._cargar_modelo, name='carga-embeddings', daemon=True).start()
+
+    def _cargar_modelo(self):
+        """Carga el SentenceTransformer y embebe las escrituras que llegaron mientras tanto."""
         try:
-            with open(self.index_path, 'rb') as f:
-                self.index = pickle.load(f)
-        except (EOFError, pickle.UnpicklingError, Exception) as e:
-            print(f'[Embeddings] Error al cargar el índice: {e}. Se creará uno nuevo.')
-            self.index = {}
-            with open(self.index_path, 'wb') as f:
-                pickle.dump(self.index, f)
-        self.recuerdos = []
-    
+            from sentence_transformers import SentenceTransformer
+            modelo = SentenceTransformer(self.model_name)
+        except Exception as e:
+            print(f'[Embeddings] No se pudo cargar el modelo {self.model_name}: {e}. Solo habrá búsqueda textual.')
+            self.listo.set_exception(e)
+            return
+        with self._lock_carga:
+            self.model = modelo
+            pendientes, self._escrituras_pendientes = self._escrituras_pendientes, []
+        if pendientes:
+            ids = [i for lote_ids, _ in pendientes for i in lote_ids]
+            contenidos = [c for _, lote_contenidos in pendientes for c in lote_contenidos]
+            try:
+                self.agregar_recuerdos_lote(ids, contenidos)
+            except Exception as e:
+                print(f'[Embeddings] Error al embeber las escrituras pendientes: {e}')
+        self.listo.set_result(True)
+
+    def esta_listo(self):
+        """Indica si el modelo ya está cargado y las escrituras en cola fueron embebidas."""
+        return self.listo.done() and self.listo.exception() is None
+
+    def esperar_modelo(self, timeout=None):
+        """Bloquea hasta que el modelo esté cargado. Propaga el error si la carga falló."""
+        return self.listo.result(timeout)
+
+    def __len__(self):
+        return len(self.almacen)
+
+    def __contains__(self, id_recuerdo):
+        return id_recuerdo in self.almacen
+
     def _guardar_index(self):
-        """Guarda el índice y los recuerdos en disco."""
-        os.makedirs('data', exist_ok=True)
-        with open('data/embeddings_index.pkl', 'wb') as f:
-            pickle.dump(self.index, f)
-        with open('data/embeddings_recuerdos.pkl', 'wb') as f:
-            pickle.dump(self.recuerdos, f)
-    
-    def agregar_recuerdo(self, contenido, tipo="general", contexto=""):
-        """Agrega un nuevo recuerdo al sistema de embeddings."""
-        embedding = self.model.encode([contenido])[0]
-        self.index.add(np.array([embedding], dtype=np.float32))
-        self.recuerdos.append({
-            'contenido': contenido,
-            'tipo': tipo,
-            'contexto': contexto,
-            'fecha': datetime.now().isoformat()
-        })
-        self._guardar_index()
-    
-    def buscar_similar(self, consulta, k=5):
-        """Busca recuerdos similares usando embeddings semánticos."""
-        query_embedding = self.model.encode([consulta])[0]
-        D, I = self.index.search(np.array([query_embedding], dtype=np.float32), k)
-        
-        resultados = []
-        for i, (distancia, idx) in enumerate(zip(D[0], I[0])):
-            if idx < len(self.recuerdos):
-                recuerdo = self.recuerdos[idx]
-                resultados.append({
-                    'contenido': recuerdo['contenido'],
-                    'tipo': recuerdo['tipo'],
-                    'contexto': recuerdo['contexto'],
-                    'fecha': recuerdo['fecha'],
-                    'relevancia': 1.0 / (1.0 + distancia)  # Normalizar relevancia
-                })
-        
-        return sorted(resultados, key=lambda x: x['relevancia'], reverse=True) 
\ No newline at end of file
+        """Fusiona los segmentos pendientes con el almacén vectorial en disco."""
+        self.almacen.guardar()
+
+    def codificar(self, textos, tamano_lote=64):
+        """Devuelve los embeddings de los textos; solo pasa por el modelo lo que no está en caché.
+
+        Si el modelo aún no está cargado, espera a que lo esté.
+        """
+        claves = [self.cache.clave(t) for t in textos]
+        encontrados = self.cache.obtener(claves)
+        faltantes = {}
+        for clave, texto in zip(claves, textos):
+            if clave not in encontrados and clave not in faltantes:
+                faltantes[clave] = texto
+        if faltantes:
+            if self.model is None:
+                self.esperar_modelo()
+            nuevos = np.asarray(self.model.encode(list(faltantes.values()), batch_size=tamano_lote), dtype=np.float32)
+            pares = list(zip(faltantes.keys(), nuevos))
+            self.cache.guardar(pares)
+            encontrados.update(pares)
+        return np.array([encontrados[clave] for clave in claves], dtype=np.float32)
+
+    def agregar_recuerdo(self, id_recuerdo, contenido):
+        """Agrega el embedding de un recuerdo usando su ID de SQLite. Solo anexa al segmento activo."""
+        return self.agregar_recuerdos_lote([id_recuerdo], [contenido])
+
+    def agregar_recuerdos_lote(self, ids, contenidos, tamano_lote=64, vectores=None):
+        """Codifica los contenidos por lotes y los agrega al almacén en una sola actualización.
+
+        `vectores` puede traer embeddings ya calculados (None donde falten); solo se codifica el resto.
+        Mientras el modelo carga, las escrituras se encolan y se embeben al terminar la carga.
+        """
+        if not contenidos:
+            return 0
+        with self._lock_carga:
+            if self.model is None:
+                if not self.listo.done():
+                    self._escrituras_pendientes.append((list(ids), list(contenidos)))
+                return 0
+        vectores = list(vectores) if vectores is not None else [None] * len(contenidos)
+        faltantes = [i for i, v in enumerate(vectores) if v is None]
+        if faltantes:
+            for i, vector in zip(faltantes, self.codificar([contenidos[i] for i in faltantes], tamano_lote)):
+                vectores[i] = vector
+        return self.almacen.agregar(list(ids), np.asarray(vectores, dtype=np.float32))
+
+    def reindexar(self, pares):
+        """Genera los embeddings de una lista de (id, contenido) que falten en el almacén."""
+        if not pares:
+            return 0
+        presentes = self.almacen.contiene([i for i, _ in pares])
+        pares = [par for par, presente in zip(pares, presentes) if not presente]
+        if not pares:
+            return 0
+        return self.agregar_recuerdos_lote([i for i, _ in pares], [c for _, c in pares])
+
+    def buscar_similar(self, consulta, k=5, embedding=None):
+        """Busca recuerdos similares usando embeddings semánticos. Devuelve IDs y relevancia.
+
+        Si se pasa `embedding` (el de la consulta, ya calculado) no se vuelve a codificar.
+        Devuelve una lista vacía mientras el modelo carga; la búsqueda textual cubre ese intervalo.
+        """
+        if len(self.almacen) == 0 or self.model is None:
+            return []
+        query_embedding = embedding if embedding is not None else self.codificar([consulta])[0]
+        return [
+            {'id': id_recuerdo, 'relevancia': similitud}
+            for id_recuerdo, similitud in self.almacen.buscar(query_embedding, k)
+        ]
+
+
+_gestores = {}
+_lock_gestores = threading.Lock()
+
+def obtener_gestor_embeddings(model_name='paraphrase-multilingual-MiniLM-L12-v2', directorio='data', **opciones):
+    """Devuelve el GestorEmbeddings compartido del proceso para (modelo, directorio).
+
+    Las opciones solo se usan en la primera llamada, cuando se construye el gestor.
+    """
+    clave = (model_name, os.path.abspath(directorio))
+    with _lock_gestores:
+        if clave not in _gestores:
+            _gestores[clave] = GestorEmbeddings(model_name, directorio, **opciones)
+        return _gestores[clave]
@@ -0,0 +1,91 @@
+"""
+Escritura diferida (write-behind) de recuerdos para Sassy.
+Los recuerdos se encolan y un hilo en segundo plano los guarda agrupados en
+una sola transacción cada `intervalo_ms` milisegundos o `max_lote` recuerdos,
+lo que ocurra primero. La cola es acotada: si se llena, quien encola espera
+(contrapresión) en lugar de acumular memoria sin límite.
+"""
+
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class EscrituraDiferida:
+    def __init__(self, guardar_lote, capacidad=1000, max_lote=64, intervalo_ms=50):
+        """`guardar_lote(items)` recibe una lista de dicts y devuelve la lista de IDs asignados."""
+        self.guardar_lote = guardar_lote
+        self.max_lote = max_lote
+        self.intervalo = intervalo_ms / 1000.0
+        self._cola = queue.Queue(maxsize=capacidad)
+        self._detenido = False
+        self._hilo = threading.Thread(target=self._trabajar, name='escritura-diferida', daemon=True)
+        self._hilo.start()
+
+    def encolar(self, item, timeout=None):
+        """Encola un recuerdo y devuelve un Future con su ID. Bloquea si la cola está llena."""
+        futuro = Future()
+        if self._detenido:
+            futuro.set_exception(RuntimeError('La escritura diferida está detenida'))
+            return futuro
+        try:
+            self._cola.put_nowait((item, futuro))
+        except queue.Full:
+            print('[Memoria] Cola de escritura llena; esperando a que se vacíe...')
+            self._cola.put((item, futuro), timeout=timeout)
+        return futuro
+
+    def pendientes(self):
+        return self._cola.qsize()
+
+    def _trabajar(self):
+        while True:
+            primero = self._cola.get()
+            if primero is None:
+                self._cola.task_done()
+                return
+            lote = [primero]
+            limite = time.monotonic() + self.intervalo
+            fin = False
+            while len(lote) < self.max_lote:
+                restante = limite - time.monotonic()
+                if restante <= 0:
+                    break
+                try:
+                    siguiente = self._cola.get(timeout=restante)
+                except queue.Empty:
+                    break
+                if siguiente is None:
+                    fin = True
+                    break
+                lote.append(siguiente)
+            self._guardar(lote)
+            for _ in range(len(lote) + fin):
+                self._cola.task_done()
+            if fin:
+                return
+
+    def _guardar(self, lote):
+        try:
+            ids = self.guardar_lote([item for item, _ in lote])
+        except Exception as e:
+            print(f'[Memoria] Error al guardar {len(lote)} recuerdos en segundo plano: {e}')
+            for _, futuro in lote:
+                futuro.set_exception(e)
+            return
+        for (_, futuro), id_recuerdo in zip(lote, ids):
+            futuro.set_result(id_recuerdo)
+
+    def vaciar(self):
+        """Bloquea hasta que todo lo encolado se haya guardado."""
+        if self._hilo.is_alive():
+            self._cola.join()
+
+    def detener(self):
+        """Guarda lo pendiente y termina el hilo de escritura."""
+        if self._detenido:
+            return
+        self._detenido = True
+        self._cola.put(None)
+        self._hilo.join()
@@ -0,0 +1,164 @@
+"""
+Índices de vecinos aproximados (ANN) para el almacén vectorial de Sassy.
+Envuelven faiss (HNSW o IVF-PQ) y hnswlib con la misma interfaz:
+agregar(ids, vectores), buscar(consulta, k), ajustar(...) y guardar(ruta).
+Todos usan producto interno, que con vectores normalizados es la similitud coseno.
+"""
+
+import numpy as np
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+BACKENDS = ('auto', 'flat', 'hnsw', 'ivfpq', 'hnswlib')
+
+
+def resolver_backend(backend):
+    """Traduce 'auto' al mejor backend instalado; devuelve None si no hay ninguno o se pidió 'flat'."""
+    if backend not in BACKENDS:
+        raise ValueError(f'Backend ANN no soportado: {backend}')
+    if backend == 'auto':
+        if faiss is not None:
+            return 'hnsw'
+        return 'hnswlib' if hnswlib is not None else None
+    if backend in ('hnsw', 'ivfpq') and faiss is None:
+        print(f'[Embeddings] faiss no está instalado; el índice {backend} no está disponible.')
+        return 'hnswlib' if hnswlib is not None else None
+    if backend == 'hnswlib' and hnswlib is None:
+        print('[Embeddings] hnswlib no está instalado; se usará búsqueda exacta.')
+        return None
+    return None if backend == 'flat' else backend
+
+
+def crear_indice_ann(backend, dimension, ef_busqueda=64, nprobe=16, ruta=None):
+    """Crea el índice del backend indicado, o lo abre desde `ruta` si se indica."""
+    if backend == 'hnsw':
+        return IndiceHNSWFaiss(dimension, ef_busqueda=ef_busqueda, ruta=ruta)
+    if backend == 'ivfpq':
+        return IndiceIVFPQFaiss(dimension, nprobe=nprobe, ruta=ruta)
+    if backend == 'hnswlib':
+        return IndiceHnswlib(dimension, ef_busqueda=ef_busqueda, ruta=ruta)
+    raise ValueError(f'Backend ANN no soportado: {backend}')
+
+
+class IndiceHNSWFaiss:
+    """Grafo HNSW de faiss. Inserciones incrementales sin entrenamiento."""
+    requiere_entrenamiento = False
+
+    def __init__(self, dimension, m=32, ef_construccion=200, ef_busqueda=64, ruta=None):
+        if ruta:
+            self._indice = faiss.read_index(ruta)
+        else:
+            hnsw = faiss.IndexHNSWFlat(dimension, m, faiss.METRIC_INNER_PRODUCT)
+            hnsw.hnsw.efConstruction = ef_construccion
+            self._indice = faiss.IndexIDMap(hnsw)
+        self._hnsw = faiss.downcast_index(self._indice.index)
+        self.ajustar(ef_busqueda=ef_busqueda)
+
+    def __len__(self):
+        return self._indice.ntotal
+
+    def ajustar(self, ef_busqueda=None, nprobe=None):
+        """Cambia efSearch: más alto da más recall a cambio de latencia."""
+        if ef_busqueda:
+            self._hnsw.hnsw.efSearch = ef_busqueda
+
+    def agregar(self, ids, vectores):
+        self._indice.add_with_ids(np.ascontiguousarray(vectores, dtype=np.float32), np.asarray(ids, dtype=np.int64))
+
+    def buscar(self, consulta, k):
+        D, I = self._indice.search(consulta[None, :], k)
+        return [(int(i), float(d)) for d, i in zip(D[0], I[0]) if i != -1]
+
+    def guardar(self, ruta):
+        faiss.write_index(self._indice, ruta)
+
+
+class IndiceIVFPQFaiss:
+    """Listas invertidas con cuantización de producto: poca RAM, puntajes aproximados. Necesita entrenamiento."""
+    requiere_entrenamiento = True
+
+    def __init__(self, dimension, nprobe=16, ruta=None):
+        self.dimension = dimension
+        self.nprobe = nprobe
+        self._indice = faiss.read_index(ruta) if ruta else None
+        self.ajustar(nprobe=nprobe)
+
+    @property
+    def entrenado(self):
+        return self._indice is not None and self._indice.is_trained
+
+    def __len__(self):
+        return self._indice.ntotal if self._indice is not None else 0
+
+    def ajustar(self, ef_busqueda=None, nprobe=None):
+        """Cambia cuántas listas se recorren por consulta."""
+        if nprobe:
+            self.nprobe = nprobe
+            if self._indice is not None:
+                self._indice.nprobe = nprobe
+
+    def entrenar(self, muestra, total):
+        """Entrena los centroides y los subcuantizadores con una muestra de los vectores."""
+        listas = int(min(65536, max(16, 4 * np.sqrt(total))))
+        listas = min(listas, max(1, len(muestra) // 39))
+        # Subcuantizadores de al menos 4 dimensiones que dividan la dimensión
+        subcuantizadores = next(m for m in range(max(1, self.dimension // 4), 0, -1) if self.dimension % m == 0)
+        cuantizador = faiss.IndexFlatIP(self.dimension)
+        indice = faiss.IndexIVFPQ(cuantizador, self.dimension, listas, subcuantizadores, 8, faiss.METRIC_INNER_PRODUCT)
+        indice.train(np.ascontiguousarray(muestra, dtype=np.float32))
+        indice.nprobe = self.nprobe
+        self._cuantizador = cuantizador  # faiss no conserva la referencia desde Python
+        self._indice = indice
+
+    def agregar(self, ids, vectores):
+        self._indice.add_with_ids(np.ascontiguousarray(vectores, dtype=np.float32), np.asarray(ids, dtype=np.int64))
+
+    def buscar(self, consulta, k):
+        D, I = self._indice.search(consulta[None, :], k)
+        return [(int(i), float(d)) for d, i in zip(D[0], I[0]) if i != -1]
+
+    def guardar(self, ruta):
+        faiss.write_index(self._indice, ruta)
+
+
+class IndiceHnswlib:
+    """Grafo HNSW de hnswlib, para instalaciones sin faiss."""
+    requiere_entrenamiento = False
+
+    def __init__(self, dimension, m=32, ef_construccion=200, ef_busqueda=64, ruta=None):
+        self._indice = hnswlib.Index(space='ip', dim=dimension)
+        if ruta:
+            self._indice.load_index(ruta)
+        else:
+            self._indice.init_index(max_elements=1024, ef_construction=ef_construccion, M=m)
+        self.ajustar(ef_busqueda=ef_busqueda)
+
+    def __len__(self):
+        return self._indice.get_current_count()
+
+    def ajustar(self, ef_busqueda=None, nprobe=None):
+        if ef_busqueda:
+            self._indice.set_ef(ef_busqueda)
+
+    def agregar(self, ids, vectores):
+        necesarios = len(self) + len(ids)
+        capacidad = self._indice.get_max_elements()
+        if necesarios > capacidad:
+            self._indice.resize_index(max(necesarios, capacidad * 2))
+        self._indice.add_items(np.asarray(vectores, dtype=np.float32), np.asarray(ids, dtype=np.int64))
+
+    def buscar(self, consulta, k):
+        etiquetas, distancias = self._indice.knn_query(consulta[None, :], k=min(k, len(self)))
+        # En el espacio 'ip' hnswlib devuelve 1 - producto interno
+        return [(int(i), float(1.0 - d)) for i, d in zip(etiquetas[0], distancias[0])]
+
+    def guardar(self, ruta):
+        self._indice.save_index(ruta)
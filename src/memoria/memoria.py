@@ -3,37 +3,113 @@ Módulo de memoria contextual para Sassy.
 Integra almacenamiento SQLite con búsqueda semántica.
 """
 
-import sqlite3
 import os
+import re
+import sqlite3
 from datetime import datetime
-from .embeddings import GestorEmbeddings
+from .conexion import ConexionesSQLite
+from .registro_recientes import RegistroRecientes
+from .escritura_diferida import EscrituraDiferida
+from .duplicados import IndiceDuplicados
+from .registro_nutricion import RegistroNutricion
+from .analisis_turno import AnalisisTurno
+from .clasificador import clasificador
+from .recientes import RecuerdosRecientes
+from .cache_consultas import CacheConsultas, normalizar_consulta
+from .embeddings import obtener_gestor_embeddings
+from src.core.config import (
+    MEMORIA_COMPRESION_EMBEDDINGS, MEMORIA_INDICE_ANN, MEMORIA_UMBRAL_ANN,
+    MEMORIA_ANN_EF_BUSQUEDA, MEMORIA_ANN_NPROBE, MEMORIA_CACHE_CONSULTAS,
+    NUTRICION_TRABAJADORES, NUTRICION_CONCURRENCIA_POR_HOST, NUTRICION_PETICIONES_POR_SEGUNDO,
+    NUTRICION_PLAZO_SEGUNDOS, NUTRICION_FRESCURA_DIAS, NUTRICION_MAX_INTENTOS
+)
 import json
 import threading
+import numpy as np
 from src.utils.web_multi_search import buscar_multiweb, obtener_contenido_url
 from src.utils.nutricion_monitor import NutricionMonitor
+from src.utils.rastreador_web import RastreadorWeb, PlazoAgotado
+from src.utils.cache_http import SinConexion
 import queue
 import time
 from typing import List, Dict
 
+# Recuerdos web que se acumulan antes de guardarlos en una sola transacción
+TAMANO_LOTE_NUTRICION = 10
+
+# Tipos en los que un recuerdo casi igual a otro se descarta. En el resto solo se descarta
+# el texto idéntico: "mi color favorito es el azul claro" corrige a "... azul oscuro", no lo repite
+TIPOS_CASI_DUPLICADOS = frozenset(('nutricion_web',))
+
+# Recuerdos recientes que se mantienen en memoria y en recuerdos.jsonl
+MAX_RECUERDOS_RECIENTES = 1000
+
+# Versión del formato de la instantánea de arranque (<db>_instantanea.json)
+VERSION_INSTANTANEA = 1
+
 class MemoriaContextual:
-    def __init__(self, db_path='data/memoria.db', nutricion_activa=True):
+    def __init__(self, db_path='data/memoria.db', nutricion_activa=True, modelo_embeddings=None):
+        """`modelo_embeddings` reemplaza al SentenceTransformer (útil en benchmarks sin red)."""
         self.db_path = db_path
-        self.embeddings = GestorEmbeddings()
+        self.ruta_instantanea = os.path.splitext(db_path)[0] + '_instantanea.json'
+        directorio = os.path.dirname(db_path) or '.'
+        self.embeddings = obtener_gestor_embeddings(
+            directorio=directorio,
+            modelo=modelo_embeddings,
+            compresion=MEMORIA_COMPRESION_EMBEDDINGS,
+            indice=MEMORIA_INDICE_ANN,
+            umbral_ann=MEMORIA_UMBRAL_ANN,
+            ef_busqueda=MEMORIA_ANN_EF_BUSQUEDA,
+            nprobe=MEMORIA_ANN_NPROBE
+        )
+        self._lock = threading.RLock()
+        # Sube con cada escritura; invalida la caché de búsquedas
+        self._generacion_escritura = 0
+        self._cache_consultas = CacheConsultas(MEMORIA_CACHE_CONSULTAS)
+        self._db = ConexionesSQLite(db_path)
+        self.duplicados = IndiceDuplicados()
+        self.registro_nutricion = RegistroNutricion(NUTRICION_FRESCURA_DIAS * 86400, NUTRICION_MAX_INTENTOS)
         self._asegurar_db()
+        self._sincronizar_embeddings()
         self._nutricion_en_curso = False
         self._monitor_nutricion = None
         self._cola_nutricion = queue.Queue()
         self.nutricion_activa = nutricion_activa
-        self.recuerdos = []
+        self.recuerdos = RecuerdosRecientes(MAX_RECUERDOS_RECIENTES)
+        self._registro_recientes = RegistroRecientes(
+            os.path.join(directorio, 'recuerdos.jsonl'),
+            capacidad=MAX_RECUERDOS_RECIENTES,
+            ruta_legado=os.path.join(directorio, 'recuerdos.json')
+        )
+        # Las escrituras del turno de conversación se guardan en segundo plano, agrupadas
+        self._escritura = EscrituraDiferida(self.guardar_recuerdos_lote)
         self.nutrir_memoria_inicial()
         if nutricion_activa:
             self.iniciar_nutricion_automatica()
         self.cargar_recuerdos()
 
     def _asegurar_db(self):
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+        """Aplica en orden las migraciones de esquema pendientes (PRAGMA user_version)."""
+        migraciones = [
+            self._migracion_tabla_recuerdos,
+            self._migracion_fts,
+            self._migracion_categorias_y_fechas,
+            self._migracion_duplicados,
+            self._migracion_registro_nutricion,
+        ]
+        for version, migracion in enumerate(migraciones, start=1):
+            with self._db.transaccion(inmediata=True) as c:
+                # Se relee dentro de la transacción por si otro proceso ya migró
+                if c.execute("PRAGMA user_version").fetchone()[0] >= version:
+                    continue
+                migracion(c)
+                c.execute(f"PRAGMA user_version = {version}")
+        c = self._db.cursor()
+        c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'recuerdos_fts'")
+        self._fts = c.fetchone() is not None
+
+    def _migracion_tabla_recuerdos(self, c):
+        """v1: tabla principal de recuerdos."""
         c.execute('''CREATE TABLE IF NOT EXISTS recuerdos (
                         id INTEGER PRIMARY KEY AUTOINCREMENT,
                         tipo TEXT,
@@ -44,84 +120,363 @@ class MemoriaContextual:
                         categorias TEXT,
                         metadata TEXT
                     )''')
-        conn.commit()
-        conn.close()
-
-    def guardar_recuerdo(self, contenido, tipo="general", contexto="", categorias=None, metadata=None):
-        """Guarda un recuerdo tanto en SQLite como en el sistema de embeddings. Detecta y clasifica datos personales, temas, preferencias, comandos, etc."""
-        # Clasificación automática
-        categorias = categorias or []
-        if any(x in contenido.lower() for x in ["me llamo", "mi nombre es", "soy "]):
-            tipo = "dato_usuario"
-            categorias.append("nombre")
-        if any(x in contenido.lower() for x in ["vivo en", "ciudad", "país", "pais"]):
-            tipo = "dato_usuario"
-            categorias.append("ubicacion")
-        if any(x in contenido.lower() for x in ["cumpleaños", "nací", "naci", "fecha de nacimiento"]):
-            tipo = "dato_usuario"
-            categorias.append("cumpleaños")
-        if any(x in contenido.lower() for x in ["me gusta", "prefiero", "odio", "amo", "favorito"]):
-            tipo = "preferencia"
-            categorias.append("gustos")
-        if any(x in contenido.lower() for x in ["recuerda que", "no olvides que"]):
-            tipo = "recordatorio"
-            categorias.append("recordatorio")
-        if any(x in contenido.lower() for x in ["comando", "ejecuta", "haz", "abre", "cierra"]):
-            tipo = "comando"
-            categorias.append("comando")
-        # Guardar en SQLite
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("""
-            INSERT INTO recuerdos (tipo, contenido, contexto, fecha, categorias, metadata) 
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (
-            tipo, 
-            contenido, 
-            json.dumps(contexto),
-            datetime.now().isoformat(),
-            json.dumps(categorias or []),
-            json.dumps(metadata or {})
-        ))
-        conn.commit()
-        conn.close()
-        # Guardar en embeddings
-        self.embeddings.agregar_recuerdo(contenido, tipo, contexto)
-        recuerdo = {
+
+    def _migracion_fts(self, c):
+        """v2: índice FTS5 sobre contenido y categorías, sincronizado por triggers.
+
+        Si la tabla no existía y ya hay recuerdos, la reconstruye desde `recuerdos`.
+        Sin FTS5 en este SQLite la búsqueda por palabras usará LIKE.
+        """
+        c.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'recuerdos_fts'")
+        existia = c.fetchone() is not None
+        try:
+            c.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS recuerdos_fts USING fts5(
+                            contenido, categorias,
+                            content='recuerdos', content_rowid='id',
+                            tokenize='unicode61 remove_diacritics 2'
+                        )''')
+        except sqlite3.OperationalError as e:
+            print(f"[Memoria] FTS5 no disponible ({e}); la búsqueda por palabras usará LIKE.")
+            return
+        c.execute('''CREATE TRIGGER IF NOT EXISTS recuerdos_fts_ai AFTER INSERT ON recuerdos BEGIN
+                        INSERT INTO recuerdos_fts(rowid, contenido, categorias)
+                        VALUES (new.id, new.contenido, new.categorias);
+                    END''')
+        c.execute('''CREATE TRIGGER IF NOT EXISTS recuerdos_fts_ad AFTER DELETE ON recuerdos BEGIN
+                        INSERT INTO recuerdos_fts(recuerdos_fts, rowid, contenido, categorias)
+                        VALUES ('delete', old.id, old.contenido, old.categorias);
+                    END''')
+        c.execute('''CREATE TRIGGER IF NOT EXISTS recuerdos_fts_au AFTER UPDATE OF contenido, categorias ON recuerdos BEGIN
+                        INSERT INTO recuerdos_fts(recuerdos_fts, rowid, contenido, categorias)
+                        VALUES ('delete', old.id, old.contenido, old.categorias);
+                        INSERT INTO recuerdos_fts(rowid, contenido, categorias)
+                        VALUES (new.id, new.contenido, new.categorias);
+                    END''')
+        if not existia:
+            c.execute("INSERT INTO recuerdos_fts(recuerdos_fts) VALUES ('rebuild')")
+
+    def _migracion_categorias_y_fechas(self, c):
+        """v3: tabla de unión de categorías, fecha en epoch e índices para tipo y recencia."""
+        c.execute("ALTER TABLE recuerdos ADD COLUMN fecha_epoch INTEGER")
+        # 'fecha' es ISO en hora local; el modificador 'utc' lo convierte a epoch real
+        c.execute("UPDATE recuerdos SET fecha_epoch = CAST(strftime('%s', fecha, 'utc') AS INTEGER)")
+        c.execute('''CREATE TABLE IF NOT EXISTS recuerdo_categoria (
+                        categoria TEXT NOT NULL COLLATE NOCASE,
+                        recuerdo_id INTEGER NOT NULL,
+                        PRIMARY KEY (categoria, recuerdo_id)
+                    ) WITHOUT ROWID''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_recuerdo_categoria_recuerdo ON recuerdo_categoria(recuerdo_id)")
+        c.execute('''CREATE TRIGGER IF NOT EXISTS recuerdos_categoria_ad AFTER DELETE ON recuerdos BEGIN
+                        DELETE FROM recuerdo_categoria WHERE recuerdo_id = old.id;
+                    END''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_recuerdos_tipo_relevancia_fecha ON recuerdos(tipo, relevancia, fecha_epoch)")
+        c.execute("CREATE INDEX IF NOT EXISTS idx_recuerdos_fecha ON recuerdos(fecha_epoch)")
+        filas = c.execute("SELECT id, categorias FROM recuerdos").fetchall()
+        pares = []
+        for id_recuerdo, categorias in filas:
+            try:
+                pares.extend((categoria, id_recuerdo) for categoria in json.loads(categorias or '[]'))
+            except (ValueError, TypeError):
+                continue
+        c.executemany("INSERT OR IGNORE INTO recuerdo_categoria (categoria, recuerdo_id) VALUES (?, ?)", pares)
+
+    def _migracion_duplicados(self, c):
+        """v4: firmas MinHash y bandas LSH para detectar casi-duplicados; indexa los recuerdos existentes."""
+        c.execute('''CREATE TABLE IF NOT EXISTS lsh_firmas (
+                        recuerdo_id INTEGER PRIMARY KEY,
+                        firma BLOB NOT NULL
+                    )''')
+        c.execute('''CREATE TABLE IF NOT EXISTS lsh_bandas (
+                        banda INTEGER NOT NULL,
+                        clave INTEGER NOT NULL,
+                        recuerdo_id INTEGER NOT NULL,
+                        PRIMARY KEY (banda, clave, recuerdo_id)
+                    ) WITHOUT ROWID''')
+        c.execute("CREATE INDEX IF NOT EXISTS idx_lsh_bandas_recuerdo ON lsh_bandas(recuerdo_id)")
+        c.execute('''CREATE TRIGGER IF NOT EXISTS recuerdos_lsh_ad AFTER DELETE ON recuerdos BEGIN
+                        DELETE FROM lsh_firmas WHERE recuerdo_id = old.id;
+                        DELETE FROM lsh_bandas WHERE recuerdo_id = old.id;
+                    END''')
+        for id_recuerdo, contenido in c.execute("SELECT id, contenido FROM recuerdos").fetchall():
+            self.duplicados.registrar(c, id_recuerdo, self.duplicados.firma(contenido or "")[0])
+
+    def _migracion_registro_nutricion(self, c):
+        """v5: registro de consultas de la nutrición web, para reanudarla donde quedó."""
+        c.execute('''CREATE TABLE IF NOT EXISTS nutricion_consultas (
+                        consulta TEXT PRIMARY KEY,
+                        estado TEXT NOT NULL DEFAULT 'pendiente',
+                        intentos INTEGER NOT NULL DEFAULT 0,
+                        ultima_vez REAL,
+                        prioridad INTEGER NOT NULL,
+                        orden INTEGER NOT NULL
+                    )''')
+
+    @staticmethod
+    def _consulta_fts(texto, columna='contenido'):
+        """Convierte texto libre en una consulta FTS5: todos los términos, en cualquier orden."""
+        terminos = re.findall(r'\w+', texto.lower())
+        if not terminos:
+            return None
+        return f"{{{columna}}} : (" + ' '.join(f'"{t}"' for t in terminos) + ")"
+
+    def _sincronizar_embeddings(self):
+        """Genera los embeddings de los recuerdos de SQLite que aún no estén en el almacén vectorial.
+
+        Si la instantánea del último cierre sigue vigente no hay nada que revisar.
+        """
+        if self._instantanea_vigente():
+            return
+        c = self._db.cursor()
+        c.execute("SELECT COUNT(*) FROM recuerdos")
+        if c.fetchone()[0] == len(self.embeddings):
+            return
+        c.execute("SELECT id, contenido FROM recuerdos")
+        pares = c.fetchall()
+        agregados = self.embeddings.reindexar(pares)
+        if agregados:
+            print(f"[Memoria] {agregados} recuerdos reindexados en el almacén vectorial.")
+
+    def _instantanea_vigente(self):
+        """Indica si la instantánea de guardar_estado_final sigue describiendo SQLite y el almacén.
+
+        Compara el ID máximo y el número de vectores, que se consultan en tiempo constante:
+        cualquier recuerdo insertado después del cierre sube el ID máximo.
+        """
+        try:
+            with open(self.ruta_instantanea, 'r', encoding='utf-8') as f:
+                instantanea = json.load(f)
+        except (OSError, ValueError):
+            return False
+        max_id = self._db.cursor().execute("SELECT MAX(id) FROM recuerdos").fetchone()[0]
+        return (
+            instantanea.get('version') == VERSION_INSTANTANEA
+            and instantanea.get('max_id') == max_id
+            and instantanea.get('vectores') == len(self.embeddings)
+        )
+
+    def _escribir_instantanea(self):
+        """Registra que cada recuerdo de SQLite tiene su vector, para no revisarlos al arrancar.
+
+        Los vectores e IDs ya quedan en la generación memory-mapped del almacén; aquí solo
+        se anota qué estado describen. Si falta algún vector, se borra la instantánea.
+        """
+        c = self._db.cursor()
+        ids = np.fromiter((fila[0] for fila in c.execute("SELECT id FROM recuerdos")), dtype=np.int64)
+        if not self.embeddings.almacen.contiene(ids).all():
+            if os.path.exists(self.ruta_instantanea):
+                os.remove(self.ruta_instantanea)
+            return
+        temporal = self.ruta_instantanea + '.tmp'
+        with open(temporal, 'w', encoding='utf-8') as f:
+            json.dump({
+                'version': VERSION_INSTANTANEA,
+                'max_id': int(ids.max()) if len(ids) else None,
+                'recuerdos': len(ids),
+                'vectores': len(self.embeddings),
+                'generacion': self.embeddings.almacen._generacion,
+                'creada': datetime.now().isoformat()
+            }, f)
+        os.replace(temporal, self.ruta_instantanea)
+
+    def _clasificar_recuerdo(self, contenido, tipo, categorias):
+        """Detecta y clasifica datos personales, temas, preferencias, comandos, etc."""
+        tipo, categorias, _ = clasificador.clasificar(contenido, tipo, categorias)
+        return tipo, categorias
+
+    def analizar(self, texto):
+        """Crea el AnalisisTurno de un texto, para compartir su embedding durante el turno."""
+        return AnalisisTurno(texto, self.embeddings)
+
+    def guardar_recuerdo(self, contenido, tipo="general", contexto="", categorias=None, metadata=None, embedding=None):
+        """Guarda un recuerdo tanto en SQLite como en el sistema de embeddings. Devuelve su ID.
+
+        `embedding` puede ser un vector ya calculado o un AnalisisTurno; así no se codifica otra vez.
+        """
+        return self.guardar_recuerdos_lote([{
             'contenido': contenido,
             'tipo': tipo,
-            'timestamp': time.time(),
-            'contexto': contexto or {},
-            'categorias': categorias
-        }
-        self.recuerdos.append(recuerdo)
-        if len(self.recuerdos) > 1000:
-            self.recuerdos.pop(0)
-        if len(self.recuerdos) % 100 == 0:
-            self.guardar_recuerdos()
-
-    def buscar_recuerdos(self, consulta, limite=10, tipo=None):
-        """Busca recuerdos usando búsqueda semántica y filtros."""
+            'contexto': contexto,
+            'categorias': categorias,
+            'metadata': metadata,
+            'embedding': embedding
+        }])[0]
+
+    def encolar_recuerdo(self, contenido, tipo="general", contexto="", categorias=None, metadata=None, embedding=None):
+        """Como guardar_recuerdo, pero sin esperar: devuelve un Future con el ID.
+
+        El recuerdo se guarda en segundo plano junto con los demás encolados.
+        """
+        return self._escritura.encolar({
+            'contenido': contenido,
+            'tipo': tipo,
+            'contexto': contexto,
+            'categorias': categorias,
+            'metadata': metadata,
+            'embedding': embedding
+        })
+
+    @staticmethod
+    def _vector_de(embedding):
+        """Devuelve el vector de un embedding dado como vector o como AnalisisTurno."""
+        if isinstance(embedding, AnalisisTurno):
+            return embedding.embedding
+        return embedding
+
+    def guardar_recuerdos_lote(self, items, tamano_lote=64):
+        """Guarda varios recuerdos en una sola transacción y una sola actualización del índice.
+
+        Cada item es un dict con 'contenido' y, opcionalmente, 'tipo', 'contexto',
+        'categorias', 'metadata' y 'embedding' (los mismos parámetros de guardar_recuerdo).
+        Devuelve la lista de IDs asignados, en el mismo orden. Un recuerdo idéntico a
+        otro ya guardado (o casi idéntico, en los TIPOS_CASI_DUPLICADOS) no se inserta
+        ni se embebe: recibe el ID del existente.
+        """
+        if not items:
+            return []
+        ahora = time.time()
+        fecha = datetime.fromtimestamp(ahora).isoformat()
+        filas = []
+        recientes = []
+        firmas = []
+        for item in items:
+            contenido = item['contenido']
+            contexto = item.get('contexto', "")
+            tipo, categorias = self._clasificar_recuerdo(contenido, item.get('tipo') or "general", item.get('categorias'))
+            filas.append([tipo, contenido, json.dumps(contexto), fecha, int(ahora), json.dumps(categorias, ensure_ascii=False), json.dumps(item.get('metadata') or {})])
+            recientes.append({
+                'contenido': contenido,
+                'tipo': tipo,
+                'timestamp': time.time(),
+                'contexto': contexto or {},
+                'categorias': categorias
+            })
+            firmas.append(self.duplicados.firma(contenido))
+        # Guardar en SQLite: IDs reservados dentro de la misma transacción
+        ids = []
+        nuevos = []
+        with self._db.transaccion(inmediata=True) as c:
+            c.execute("SELECT MAX(COALESCE((SELECT seq FROM sqlite_sequence WHERE name = 'recuerdos'), 0), COALESCE(MAX(id), 0)) FROM recuerdos")
+            siguiente_id = c.fetchone()[0] + 1
+            # Contenido de los recuerdos del lote que aún no están en la tabla
+            del_lote = {}
+            for i, (firma, ngramas) in enumerate(firmas):
+                # Las firmas se registran sobre la marcha: también detecta duplicados dentro del lote
+                if items[i].get('tipo') in TIPOS_CASI_DUPLICADOS:
+                    duplicado = self.duplicados.buscar(c, firma, ngramas)
+                else:
+                    duplicado = self.duplicados.buscar(c, firma, ngramas, umbral=1.0)
+                    if duplicado is not None and self._contenido_de(c, duplicado[0], del_lote) != filas[i][1]:
+                        duplicado = None
+                if duplicado is not None:
+                    ids.append(duplicado[0])
+                    continue
+                del_lote[siguiente_id] = filas[i][1]
+                ids.append(siguiente_id)
+                nuevos.append(i)
+                self.duplicados.registrar(c, siguiente_id, firma)
+                siguiente_id += 1
+            c.executemany("""
+                INSERT INTO recuerdos (id, tipo, contenido, contexto, fecha, fecha_epoch, categorias, metadata)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, [[ids[i]] + filas[i] for i in nuevos])
+            c.executemany(
+                "INSERT OR IGNORE INTO recuerdo_categoria (categoria, recuerdo_id) VALUES (?, ?)",
+                [(categoria, ids[i]) for i in nuevos for categoria in recientes[i]['categorias']]
+            )
+        # Guardar en embeddings con los mismos IDs de SQLite
+        self.embeddings.agregar_recuerdos_lote(
+            [ids[i] for i in nuevos],
+            [filas[i][1] for i in nuevos],
+            tamano_lote=tamano_lote,
+            vectores=[self._vector_de(items[i].get('embedding')) for i in nuevos]
+        )
+        with self._lock:
+            self.recuerdos.agregar(recientes)
+            self._registro_recientes.agregar(recientes)
+            if self._registro_recientes.requiere_compactacion():
+                self.guardar_recuerdos()
+        self._marcar_escritura()
+        return ids
+
+    @staticmethod
+    def _contenido_de(c, id_recuerdo, del_lote):
+        if id_recuerdo in del_lote:
+            return del_lote[id_recuerdo]
+        fila = c.execute("SELECT contenido FROM recuerdos WHERE id = ?", (id_recuerdo,)).fetchone()
+        return fila[0] if fila else None
+
+    def _marcar_escritura(self):
+        """Sube la generación de escritura: las búsquedas en caché dejan de ser válidas."""
+        with self._lock:
+            self._generacion_escritura += 1
+
+    def buscar_recuerdos(self, consulta, limite=10, tipo=None, embedding=None):
+        """Busca recuerdos usando búsqueda semántica y filtros.
+
+        `embedding` (vector o AnalisisTurno de la consulta) evita volver a codificarla.
+        Los resultados se reutilizan mientras no se escriba nada nuevo en la memoria.
+        """
+        # Mientras el modelo carga no hay parte semántica: esos resultados van en otra entrada
+        return self._cache_consultas.obtener(
+            (normalizar_consulta(consulta), limite, tipo, self.embeddings.model is not None),
+            self._generacion_escritura,
+            lambda: self._buscar_recuerdos(consulta, limite, tipo, embedding)
+        )
+
+    def _buscar_recuerdos(self, consulta, limite, tipo, embedding):
         # Primero buscar por embeddings
-        resultados_embeddings = self.embeddings.buscar_similar(consulta, limite)
-        
-        # Luego buscar en SQLite por palabras clave
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+        similares = {
+            r['id']: r['relevancia']
+            for r in self.embeddings.buscar_similar(consulta, limite, embedding=self._vector_de(embedding))
+        }
         
-        query = "SELECT contenido, fecha, relevancia, categorias FROM recuerdos WHERE contenido LIKE ?"
-        params = [f"%{consulta}%"]
+        c = self._db.cursor()
+
+        # Resolver los IDs semánticos contra SQLite
+        resultados_embeddings = []
+        if similares:
+            query = f"SELECT id, contenido, fecha, categorias FROM recuerdos WHERE id IN ({','.join('?' * len(similares))})"
+            params = list(similares)
+            if tipo:
+                query += " AND tipo = ?"
+                params.append(tipo)
+            c.execute(query, params)
+            resultados_embeddings = [{
+                'contenido': r[1],
+                'fecha': r[2],
+                'relevancia': similares[r[0]],
+                'categorias': r[3] or '[]'
+            } for r in c.fetchall()]
         
-        if tipo:
-            query += " AND tipo = ?"
-            params.append(tipo)
-            
-        query += " ORDER BY relevancia DESC, fecha DESC LIMIT ?"
+        # Luego buscar en SQLite por palabras clave (FTS5 con ranking bm25)
+        consulta_fts = self._consulta_fts(consulta) if self._fts else None
+        if consulta_fts:
+            query = """SELECT r.contenido, r.fecha, r.relevancia, r.categorias
+                       FROM recuerdos_fts JOIN recuerdos r ON r.id = recuerdos_fts.rowid
+                       WHERE recuerdos_fts MATCH ?"""
+            params = [consulta_fts]
+            if tipo:
+                query += " AND r.tipo = ?"
+                params.append(tipo)
+            query += " ORDER BY rank LIMIT ?"
+        elif self._fts and not consulta.strip():
+            query = "SELECT contenido, fecha, relevancia, categorias FROM recuerdos"
+            params = []
+            if tipo:
+                query += " WHERE tipo = ?"
+                params.append(tipo)
+            query += " ORDER BY relevancia DESC, fecha_epoch DESC LIMIT ?"
+        else:
+            query = "SELECT contenido, fecha, relevancia, categorias FROM recuerdos WHERE contenido LIKE ?"
+            params = [f"%{consulta}%"]
+            if tipo:
+                query += " AND tipo = ?"
+                params.append(tipo)
+            query += " ORDER BY relevancia DESC, fecha_epoch DESC LIMIT ?"
         params.append(limite)
         
         c.execute(query, params)
         resultados_sqlite = c.fetchall()
-        conn.close()
 
         # Combinar y ordenar resultados
         resultados_combinados = []
@@ -132,7 +487,7 @@ class MemoriaContextual:
                 'contenido': r['contenido'],
                 'fecha': r['fecha'],
                 'relevancia': r['relevancia'],
-                'categorias': json.loads(r.get('categorias', '[]')),
+                'categorias': json.loads(r['categorias']),
                 'fuente': 'semantica'
             })
         
@@ -156,66 +511,59 @@ class MemoriaContextual:
                 resultados_unicos.append(r)
                 contenidos_vistos.add(r['contenido'])
         
-        # Buscar en los recuerdos recientes
-        for recuerdo in reversed(self.recuerdos):
-            if tipo and recuerdo['tipo'] != tipo:
-                continue
-            if consulta in recuerdo['contenido'].lower():
-                resultados_unicos.append(recuerdo)
-                if len(resultados_unicos) >= limite:
-                    break
+        # Buscar en los recuerdos recientes (índice invertido, del más reciente al más antiguo)
+        if len(resultados_unicos) < limite:
+            for recuerdo in self.recuerdos.buscar(consulta, tipo=tipo, limite=limite):
+                if recuerdo['contenido'] not in contenidos_vistos:
+                    resultados_unicos.append(recuerdo)
+                    contenidos_vistos.add(recuerdo['contenido'])
+                    if len(resultados_unicos) >= limite:
+                        break
         
         return resultados_unicos[:limite]
 
     def actualizar_relevancia(self, id_recuerdo, nueva_relevancia):
         """Actualiza la relevancia de un recuerdo específico."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("UPDATE recuerdos SET relevancia = ? WHERE id = ?", 
-                 (nueva_relevancia, id_recuerdo))
-        conn.commit()
-        conn.close()
+        with self._db.transaccion() as c:
+            c.execute("UPDATE recuerdos SET relevancia = ? WHERE id = ?", 
+                     (nueva_relevancia, id_recuerdo))
+        self._marcar_escritura()
 
     def agregar_categoria(self, id_recuerdo, categoria):
         """Agrega una categoría a un recuerdo existente."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("SELECT categorias FROM recuerdos WHERE id = ?", (id_recuerdo,))
-        categorias_actuales = json.loads(c.fetchone()[0] or '[]')
-        if categoria not in categorias_actuales:
-            categorias_actuales.append(categoria)
-            c.execute("UPDATE recuerdos SET categorias = ? WHERE id = ?",
-                     (json.dumps(categorias_actuales), id_recuerdo))
-            conn.commit()
-        conn.close()
+        with self._db.transaccion(inmediata=True) as c:
+            c.execute("SELECT categorias FROM recuerdos WHERE id = ?", (id_recuerdo,))
+            categorias_actuales = json.loads(c.fetchone()[0] or '[]')
+            if categoria not in categorias_actuales:
+                categorias_actuales.append(categoria)
+                c.execute("UPDATE recuerdos SET categorias = ? WHERE id = ?",
+                         (json.dumps(categorias_actuales, ensure_ascii=False), id_recuerdo))
+                c.execute("INSERT OR IGNORE INTO recuerdo_categoria (categoria, recuerdo_id) VALUES (?, ?)",
+                         (categoria, id_recuerdo))
+        self._marcar_escritura()
 
     def buscar_por_categoria(self, categoria, limite=5):
         """Busca recuerdos por categoría específica."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+        c = self._db.cursor()
         c.execute("""
-            SELECT contenido, fecha, relevancia 
-            FROM recuerdos 
-            WHERE categorias LIKE ? 
-            ORDER BY relevancia DESC, fecha DESC 
+            SELECT r.contenido, r.fecha, r.relevancia 
+            FROM recuerdo_categoria rc JOIN recuerdos r ON r.id = rc.recuerdo_id 
+            WHERE rc.categoria = ? 
+            ORDER BY r.relevancia DESC, r.fecha_epoch DESC 
             LIMIT ?
-        """, (f"%{categoria}%", limite))
-        resultados = c.fetchall()
-        conn.close()
-        return resultados
+        """, (categoria, limite))
+        return c.fetchall()
 
     def ultimos_recuerdos(self, limite=5):
         """Obtiene los últimos recuerdos almacenados."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+        c = self._db.cursor()
         c.execute("""
             SELECT contenido, fecha, relevancia, categorias 
             FROM recuerdos 
-            ORDER BY fecha DESC 
+            ORDER BY fecha_epoch DESC, id DESC 
             LIMIT ?
         """, (limite,))
         resultados = c.fetchall()
-        conn.close()
         return [{
             'contenido': r[0],
             'fecha': r[1],
@@ -225,11 +573,9 @@ class MemoriaContextual:
 
     def nutrir_memoria_inicial(self):
         """Nutre la base de datos con recuerdos iniciales si está vacía."""
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
+        c = self._db.cursor()
         c.execute("SELECT COUNT(*) FROM recuerdos")
         cantidad = c.fetchone()[0]
-        conn.close()
         if cantidad > 0:
             return  # Ya hay recuerdos
         # Recuerdos iniciales
@@ -245,13 +591,7 @@ class MemoriaContextual:
             {"contenido": "Me esfuerzo por aprender de cada conversación contigo", "tipo": "personalidad", "categorias": ["ia", "aprendizaje"]},
             {"contenido": "Si me dices 'recuerda que...' guardaré esa información para ti", "tipo": "ayuda", "categorias": ["comandos", "memoria"]}
         ]
-        for r in recuerdos:
-            self.guardar_recuerdo(
-                r["contenido"],
-                tipo=r.get("tipo", "general"),
-                categorias=r.get("categorias", []),
-                contexto="nutricion_inicial"
-            )
+        self.guardar_recuerdos_lote([dict(r, contexto="nutricion_inicial") for r in recuerdos])
 
     def nutrir_memoria_desde_internet(self):
         # Temas priorizados
@@ -264,18 +604,23 @@ class MemoriaContextual:
         variaciones = [
             "curiosidades de {}", "datos interesantes de {}", "información sobre {}", "consejos de {}", "ejemplos de {}", "beneficios de {}", "importancia de {}", "historia de {}", "frases célebres de {}", "cómo se usa {}", "tutorial de {}", "mejores prácticas de {}", "expresiones de {}", "slang de {}", "cultura de {}", "impacto de {}", "personajes de {}", "hechos históricos de {}"
         ]
-        # Consultas únicas y priorizadas
-        consultas = set()
-        for tema in temas_prioridad:
-            for variacion in variaciones:
-                consulta = variacion.format(tema).lower().strip()
-                consultas.add(consulta)
-        for tema in temas_secundarios:
-            for variacion in variaciones[:6]:  # Menos variaciones para secundarios
-                consulta = variacion.format(tema).lower().strip()
-                consultas.add(consulta)
-        consultas = list(consultas)
+        # Consultas únicas, en orden fijo: primero todas las de temas prioritarios
+        prioritarias = list(dict.fromkeys(
+            variacion.format(tema).lower().strip() for tema in temas_prioridad for variacion in variaciones
+        ))
+        secundarias = [
+            consulta for consulta in dict.fromkeys(
+                variacion.format(tema).lower().strip() for tema in temas_secundarios for variacion in variaciones[:6]  # Menos variaciones para secundarios
+            ) if consulta not in prioritarias
+        ]
+        # Solo las pendientes: lo buscado hace poco en una ejecución anterior no se repite
+        with self._db.transaccion(inmediata=True) as c:
+            consultas = self.registro_nutricion.planificar(c, [prioritarias, secundarias])
         total_consultas = len(consultas)
+        print(f"[Memoria] Nutrición: {total_consultas} de {len(prioritarias) + len(secundarias)} consultas pendientes.")
+        if not consultas:
+            self._nutricion_en_curso = False
+            return
         
         # Crear monitor solo si no existe
         if not hasattr(self, '_monitor_nutricion') or self._monitor_nutricion is None:
@@ -284,45 +629,99 @@ class MemoriaContextual:
         else:
             monitor = self._monitor_nutricion
 
-        def nutricion_worker():
+        # Las consultas se lanzan en paralelo; los límites por host evitan saturar cada sitio
+        rastreador = RastreadorWeb(
+            trabajadores=NUTRICION_TRABAJADORES,
+            concurrencia_por_host=NUTRICION_CONCURRENCIA_POR_HOST,
+            tasa_por_host=NUTRICION_PETICIONES_POR_SEGUNDO,
+            rafaga_por_host=NUTRICION_CONCURRENCIA_POR_HOST,
+            plazo=NUTRICION_PLAZO_SEGUNDOS
+        )
+
+        def procesar_consultas():
             recuerdos_guardados = set()
+            lote = []
+            estados = []
             contador = 0
-            for consulta in consultas:
+
+            def vaciar_lote():
+                try:
+                    if lote:
+                        self.guardar_recuerdos_lote(lote)
+                    # El registro se escribe después de los recuerdos: una consulta solo consta como hecha si su recuerdo ya está guardado
+                    if estados:
+                        with self._db.transaccion() as c:
+                            self.registro_nutricion.registrar(c, estados)
+                except Exception as e:
+                    # Lo que no llegó al registro sigue pendiente y se repetirá en la próxima nutrición
+                    print(f"[Memoria] Error guardando el lote de nutrición: {e}")
+                finally:
+                    lote.clear()
+                    estados.clear()
+
+            # Las respuestas llegan en orden de finalización; el filtrado y el guardado por lotes siguen en este hilo
+            for consulta, respuesta, error in rastreador.ejecutar(consultas, lambda c: buscar_multiweb(c, extra_info=True)):
                 fuente = "-"
                 mensaje = ""
                 texto = ""
+                estado = "error"
                 try:
-                    resultado, extra = buscar_multiweb(consulta, extra_info=True)
+                    if error is not None:
+                        raise error
+                    resultado, extra = respuesta
                     # Filtro: solo guardar si es útil, largo y no contiene errores
                     if resultado and len(resultado) > 80 and not any(x in resultado.lower() for x in ["error", "sin resultado", "ver más en wikipedia", "ver mas en wikipedia"]):
                         # Añadir contenido extra si está disponible
                         if extra and len(extra) > 100:
                             resultado += f"\n\n[Contenido extendido:]\n{extra[:1200]}..."
-                        if resultado not in recuerdos_guardados:
-                            self.guardar_recuerdo(
-                                resultado,
-                                tipo="nutricion_web",
-                                categorias=["internet", "auto_nutricion"],
-                                contexto="nutricion_automatica",
-                                metadata={"fuente_detectada": True, "consulta": consulta}
-                            )
+                        if resultado not in recuerdos_guardados and not self.es_duplicado(resultado):
+                            lote.append({
+                                'contenido': resultado,
+                                'tipo': "nutricion_web",
+                                'categorias': ["internet", "auto_nutricion"],
+                                'contexto': "nutricion_automatica",
+                                'metadata': {"fuente_detectada": True, "consulta": consulta}
+                            })
+                            if len(lote) >= TAMANO_LOTE_NUTRICION:
+                                vaciar_lote()
                             recuerdos_guardados.add(resultado)
                             contador += 1
                             fuente = "multiweb"
                             mensaje = f"✔ Recuerdo guardado de: {consulta}"
                             texto = resultado
+                            estado = "hecha"
                         else:
                             mensaje = f"(Duplicado) {consulta}"
+                            estado = "duplicada"
                     else:
                         mensaje = f"Sin resultado: {consulta}"
+                        estado = "sin_resultado"
+                except (PlazoAgotado, SinConexion):
+                    # Cortada por el plazo, al cerrar o sin conexión: sigue pendiente sin contar como intento
+                    mensaje = f"[Interrumpida] {consulta}"
+                    estado = None
                 except Exception as e:
                     mensaje = f"[ERROR] {e}"
+                if estado is not None:
+                    estados.append((consulta, estado))
+                if len(estados) >= TAMANO_LOTE_NUTRICION:
+                    vaciar_lote()
                 self._cola_nutricion.put((contador, fuente, mensaje, texto))
                 if monitor.cerrado:
-                    return
+                    rastreador.detener()
+            vaciar_lote()
+            if monitor.cerrado:
+                return
             self._cola_nutricion.put((contador, "-", "Nutrición completada", ""))
             print(f"\nResumen de nutrición: {contador} recuerdos útiles guardados de {total_consultas} consultas.")
-            self._nutricion_en_curso = False
+
+        def nutricion_worker():
+            try:
+                procesar_consultas()
+            except Exception as e:
+                print(f"[Memoria] Nutrición interrumpida por un error: {e}")
+            finally:
+                self._nutricion_en_curso = False
 
         def actualizar_monitor():
             try:
@@ -353,49 +752,80 @@ class MemoriaContextual:
         self._monitor_nutricion = None
         self.nutrir_memoria_desde_internet()
 
+    def es_duplicado(self, contenido):
+        """Indica si ya hay guardado un recuerdo casi idéntico a `contenido`."""
+        firma, ngramas = self.duplicados.firma(contenido)
+        return self.duplicados.buscar(self._db.cursor(), firma, ngramas) is not None
+
     def guardar_recuerdos(self):
-        """Guarda los recuerdos en disco."""
+        """Compacta el registro de recuerdos recientes a los últimos en memoria.
+
+        Cada recuerdo ya se anexó al guardarse; esto solo descarta las líneas antiguas.
+        """
         try:
-            os.makedirs('data', exist_ok=True)
-            with open('data/recuerdos.json', 'w', encoding='utf-8') as f:
-                json.dump(self.recuerdos, f, ensure_ascii=False, indent=2)
+            with self._lock:
+                self._registro_recientes.compactar(self.recuerdos.ultimos())
         except Exception as e:
             print(f"Error al guardar recuerdos: {e}")
 
     def cargar_recuerdos(self):
         """Carga los recuerdos desde disco."""
         try:
-            if os.path.exists('data/recuerdos.json'):
-                with open('data/recuerdos.json', 'r', encoding='utf-8') as f:
-                    self.recuerdos = json.load(f)
+            recuerdos = self._registro_recientes.cargar()
+            with self._lock:
+                self.recuerdos.reemplazar(recuerdos)
         except Exception as e:
             print(f"Error al cargar recuerdos: {e}")
 
     def guardar_estado_final(self):
         """Guarda el estado final de la memoria y embeddings en disco."""
+        # Primero lo que quede en la cola de escritura diferida
+        self._escritura.vaciar()
         # Guardar embeddings y recuerdos en disco
         if hasattr(self.embeddings, '_guardar_index'):
             self.embeddings._guardar_index()
-        self.guardar_recuerdos() 
+        self.guardar_recuerdos()
+        try:
+            self._escribir_instantanea()
+        except Exception as e:
+            print(f"[Memoria] No se pudo escribir la instantánea de arranque: {e}")
 
     def obtener_ultimas_interacciones(self, n=5):
         """Devuelve las últimas n interacciones guardadas en la memoria."""
-        return self.recuerdos[-n:] if hasattr(self, 'recuerdos') else []
+        return self.recuerdos.ultimos(n) if hasattr(self, 'recuerdos') else []
 
     def buscar_temas_relacionados(self, texto, n=3):
         """Devuelve una lista de temas relacionados encontrados en los recuerdos."""
-        temas = set()
-        for recuerdo in self.recuerdos[-50:]:
-            for palabra in texto.lower().split():
-                if palabra in recuerdo['contenido'].lower():
-                    temas.add(palabra)
-        return list(temas)[:n]
-
-    def agregar_interaccion(self, entrada, respuesta):
-        """Guarda la interacción usuario-asistente como recuerdo, detectando temas y datos personales automáticamente."""
+        return self.recuerdos.temas(texto, n=n, ventana=50)
+
+    def agregar_interaccion(self, entrada, respuesta, analisis_entrada=None, analisis_respuesta=None):
+        """Guarda la interacción usuario-asistente como recuerdo, detectando temas y datos personales automáticamente.
+
+        Con los AnalisisTurno del turno se reutilizan sus embeddings en lugar de recalcularlos.
+        """
         # Detectar si la entrada contiene datos personales o temas importantes
-        self.guardar_recuerdo(f"Usuario: {entrada}", tipo="interaccion", categorias=["usuario"])
-        self.guardar_recuerdo(f"Sassy: {respuesta}", tipo="interaccion", categorias=["asistente"])
-        # Guardar inmediatamente en disco para persistencia
-        self.recuerdos = self.recuerdos[-500:]  # Limitar a los últimos 500 recuerdos para eficiencia
-        self.guardar_recuerdos() 
\ No newline at end of file
+        self.encolar_recuerdo(f"Usuario: {entrada}", tipo="interaccion", categorias=["usuario"], embedding=analisis_entrada)
+        self.encolar_recuerdo(f"Sassy: {respuesta}", tipo="interaccion", categorias=["asistente"], embedding=analisis_respuesta)
+
+
+_instancias = {}
+_lock_instancias = threading.Lock()
+
+def obtener_memoria(db_path='data/memoria.db', nutricion_activa=True):
+    """Devuelve la MemoriaContextual compartida del proceso para db_path.
+
+    La primera llamada la construye (modelo, índice y SQLite); las siguientes
+    reciben la misma instancia. Si alguien la pide con nutrición activa y aún
+    no estaba activa, la arranca.
+    """
+    clave = os.path.abspath(db_path)
+    with _lock_instancias:
+        memoria = _instancias.get(clave)
+        if memoria is None:
+            memoria = MemoriaContextual(db_path, nutricion_activa=nutricion_activa)
+            _instancias[clave] = memoria
+            return memoria
+    if nutricion_activa and not memoria.nutricion_activa:
+        memoria.nutricion_activa = True
+        memoria.iniciar_nutricion_automatica()
+    return memoria
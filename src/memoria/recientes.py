@@ -0,0 +1,134 @@
+"""
+Recuerdos recientes en memoria para Sassy.
+Un búfer circular (deque) con los últimos recuerdos y un índice invertido
+(palabra -> recuerdos que la contienen) que se mantiene al agregar y al
+descartar, de modo que buscar por tema o por palabras sea consultar un
+diccionario en vez de recorrer todos los recuerdos. El índice se arma en la
+primera búsqueda, para que cargar los recuerdos al arrancar no lo pague.
+"""
+
+import re
+import threading
+from collections import deque
+
+_PALABRA = re.compile(r'\w+')
+
+
+def tokenizar(texto):
+    """Palabras en minúsculas del texto, en orden y sin repetir."""
+    return list(dict.fromkeys(_PALABRA.findall(texto.lower())))
+
+
+class RecuerdosRecientes:
+    def __init__(self, capacidad=1000, recuerdos=None):
+        self.capacidad = capacidad
+        # Cada entrada es (secuencia, recuerdo, contenido en minúsculas); la secuencia crece siempre
+        self._entradas = deque()
+        # None hasta la primera búsqueda
+        self._indice = None
+        # Última secuencia en la que aparece cada palabra: basta para saber si es reciente
+        self._ultima = {}
+        self._secuencia = 0
+        self._lock = threading.Lock()
+        if recuerdos:
+            self.agregar(recuerdos)
+
+    def __len__(self):
+        return len(self._entradas)
+
+    def agregar(self, recuerdos):
+        """Agrega recuerdos al final y descarta los más antiguos si se supera la capacidad."""
+        with self._lock:
+            for recuerdo in recuerdos:
+                minusculas = recuerdo['contenido'].lower()
+                self._entradas.append((self._secuencia, recuerdo, minusculas))
+                if self._indice is not None:
+                    self._indexar(self._secuencia, minusculas)
+                self._secuencia += 1
+            while len(self._entradas) > self.capacidad:
+                self._descartar_antiguo()
+
+    def _indexar(self, secuencia, minusculas):
+        for palabra in tokenizar(minusculas):
+            self._indice.setdefault(palabra, set()).add(secuencia)
+            self._ultima[palabra] = secuencia
+
+    def _asegurar_indice(self):
+        if self._indice is None:
+            self._indice = {}
+            for secuencia, _, minusculas in self._entradas:
+                self._indexar(secuencia, minusculas)
+
+    def _descartar_antiguo(self):
+        secuencia, _, minusculas = self._entradas.popleft()
+        if self._indice is None:
+            return
+        for palabra in tokenizar(minusculas):
+            secuencias = self._indice.get(palabra)
+            if secuencias is not None:
+                secuencias.discard(secuencia)
+                if not secuencias:
+                    del self._indice[palabra]
+                    del self._ultima[palabra]
+
+    def reemplazar(self, recuerdos):
+        """Sustituye todo el contenido (p. ej. al cargar desde disco)."""
+        with self._lock:
+            self._entradas.clear()
+            self._indice = None
+            self._ultima.clear()
+        self.agregar(recuerdos)
+
+    def ultimos(self, n=None):
+        """Los últimos n recuerdos (todos si n es None), del más antiguo al más reciente."""
+        with self._lock:
+            if n is None or n >= len(self._entradas):
+                return [recuerdo for _, recuerdo, _ in self._entradas]
+            if n <= 0:
+                return []
+            return [self._entradas[i][1] for i in range(len(self._entradas) - n, len(self._entradas))]
+
+    def _candidatos(self, palabras):
+        """Secuencias de los recuerdos que contienen todas las palabras."""
+        conjuntos = [self._indice.get(p) for p in palabras]
+        if not conjuntos or any(c is None for c in conjuntos):
+            return set()
+        conjuntos.sort(key=len)
+        return set.intersection(*conjuntos)
+
+    def buscar(self, consulta, tipo=None, limite=10):
+        """Recuerdos que contienen la consulta, del más reciente al más antiguo."""
+        consulta = consulta.lower()
+        palabras = tokenizar(consulta)
+        resultados = []
+        with self._lock:
+            if not palabras or not self._entradas:
+                return resultados
+            self._asegurar_indice()
+            primera = self._entradas[0][0]
+            # El índice reduce los candidatos; la frase completa se comprueba solo en ellos
+            for secuencia in sorted(self._candidatos(palabras), reverse=True):
+                _, recuerdo, minusculas = self._entradas[secuencia - primera]
+                if tipo and recuerdo.get('tipo') != tipo:
+                    continue
+                if consulta in minusculas:
+                    resultados.append(recuerdo)
+                    if len(resultados) >= limite:
+                        break
+        return resultados
+
+    def temas(self, texto, n=3, ventana=50):
+        """Palabras del texto que aparecen en alguno de los últimos `ventana` recuerdos."""
+        temas = []
+        with self._lock:
+            if not self._entradas:
+                return temas
+            self._asegurar_indice()
+            desde = self._entradas[-1][0] - ventana + 1
+            for palabra in tokenizar(texto):
+                ultima = self._ultima.get(palabra)
+                if ultima is not None and ultima >= desde:
+                    temas.append(palabra)
+                    if len(temas) >= n:
+                        break
+        return temas
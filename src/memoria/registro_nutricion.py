@@ -0,0 +1,59 @@
+"""
+Registro persistente de la nutrición web para Sassy.
+Cada consulta de nutrir_memoria_desde_internet tiene una fila en SQLite con su
+estado, intentos y la fecha de la última vez que se buscó. Al volver a empezar
+(tras cerrar la aplicación o el monitor a mitad) solo se lanzan las consultas
+pendientes, en un orden fijo: primero los temas prioritarios, después los
+secundarios. Lo completado no se vuelve a buscar hasta que pase la ventana de
+frescura.
+"""
+
+import time
+
+# Estados que cuentan como trabajo terminado dentro de la ventana de frescura
+ESTADOS_COMPLETADOS = ('hecha', 'sin_resultado', 'duplicada')
+
+
+class RegistroNutricion:
+    def __init__(self, frescura_segundos=7 * 86400, max_intentos=3):
+        """`max_intentos`: fallos seguidos tras los que una consulta espera a la siguiente ventana."""
+        self.frescura_segundos = frescura_segundos
+        self.max_intentos = max_intentos
+
+    def planificar(self, c, niveles, ahora=None):
+        """Registra las consultas y devuelve las que hay que buscar, en orden de prioridad.
+
+        `niveles` es una lista de listas de consultas, de más a menos prioritaria.
+        """
+        ahora = time.time() if ahora is None else ahora
+        filas = []
+        for prioridad, consultas in enumerate(niveles):
+            filas.extend((consulta, prioridad, orden) for orden, consulta in enumerate(consultas))
+        # Si la lista de temas cambió, las consultas ya registradas adoptan la prioridad y el orden nuevos
+        c.executemany(
+            "INSERT INTO nutricion_consultas (consulta, prioridad, orden) VALUES (?, ?, ?) "
+            "ON CONFLICT(consulta) DO UPDATE SET prioridad = excluded.prioridad, orden = excluded.orden",
+            filas
+        )
+        marcadores = ', '.join('?' * len(ESTADOS_COMPLETADOS))
+        c.execute(
+            f"""SELECT consulta FROM nutricion_consultas
+                WHERE ultima_vez IS NULL OR ultima_vez < ?
+                   OR (estado NOT IN ({marcadores}) AND intentos < ?)
+                ORDER BY prioridad, orden""",
+            (ahora - self.frescura_segundos, *ESTADOS_COMPLETADOS, self.max_intentos)
+        )
+        # Las consultas que ya no están en la lista de temas se conservan en la tabla, pero no se lanzan
+        actuales = {fila[0] for fila in filas}
+        return [consulta for consulta, in c.fetchall() if consulta in actuales]
+
+    def registrar(self, c, resultados, ahora=None):
+        """Guarda el resultado de varias consultas: `resultados` son pares (consulta, estado)."""
+        ahora = time.time() if ahora is None else ahora
+        # Un fallo suma un intento; cualquier otro estado reinicia la cuenta
+        c.executemany(
+            "UPDATE nutricion_consultas SET estado = ?, ultima_vez = ?, "
+            "intentos = CASE WHEN ? = 'error' THEN intentos + 1 ELSE 0 END WHERE consulta = ?",
+            [(estado, ahora, estado, consulta) for consulta, estado in resultados]
+        )
+
@@ -0,0 +1,93 @@
+"""
+Registro en disco de los recuerdos recientes de Sassy.
+Cada recuerdo nuevo se anexa como una línea JSON (JSONL), así que escribir un
+turno cuesta lo que ocupa ese turno y no todo el historial. Cuando el archivo
+crece por encima del doble de la capacidad se compacta a los últimos recuerdos
+con escritura a un temporal y renombrado atómico.
+"""
+
+import json
+import os
+import threading
+
+
+class RegistroRecientes:
+    def __init__(self, ruta, capacidad=1000, ruta_legado=None):
+        self.ruta = ruta
+        self.capacidad = capacidad
+        self._lock = threading.Lock()
+        self._archivo = None
+        self._lineas = 0
+        if ruta_legado and not os.path.exists(ruta) and os.path.exists(ruta_legado):
+            self._migrar(ruta_legado)
+
+    def _migrar(self, ruta_legado):
+        """Convierte el antiguo recuerdos.json (lista con indent=2) al formato JSONL."""
+        try:
+            with open(ruta_legado, 'r', encoding='utf-8') as f:
+                recuerdos = json.load(f)
+            self.compactar(recuerdos)
+            print(f'[Memoria] {len(recuerdos)} recuerdos recientes migrados a {os.path.basename(self.ruta)}.')
+        except Exception as e:
+            print(f'[Memoria] No se pudo migrar {ruta_legado}: {e}')
+
+    def cargar(self):
+        """Lee los últimos `capacidad` recuerdos; ignora una línea final incompleta."""
+        recuerdos = []
+        if not os.path.exists(self.ruta):
+            return recuerdos
+        with self._lock:
+            lineas = 0
+            posicion = 0
+            with open(self.ruta, 'rb') as f:
+                for linea in f:
+                    if not linea.endswith(b'\n'):
+                        break  # Escritura interrumpida por un cierre inesperado
+                    lineas += 1
+                    posicion += len(linea)
+                    try:
+                        recuerdos.append(json.loads(linea))
+                    except ValueError:
+                        pass
+            if posicion < os.path.getsize(self.ruta):
+                with open(self.ruta, 'r+b') as f:
+                    f.truncate(posicion)
+            self._lineas = lineas
+        return recuerdos[-self.capacidad:]
+
+    def agregar(self, recuerdos):
+        """Anexa recuerdos al final del archivo."""
+        if not recuerdos:
+            return
+        with self._lock:
+            if self._archivo is None:
+                os.makedirs(os.path.dirname(self.ruta) or '.', exist_ok=True)
+                self._archivo = open(self.ruta, 'a', encoding='utf-8')
+            self._archivo.write(''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in recuerdos))
+            self._archivo.flush()
+            self._lineas += len(recuerdos)
+
+    def requiere_compactacion(self):
+        return self._lineas > 2 * self.capacidad
+
+    def compactar(self, recuerdos):
+        """Reescribe el archivo con los últimos recuerdos de forma atómica."""
+        recuerdos = recuerdos[-self.capacidad:]
+        with self._lock:
+            os.makedirs(os.path.dirname(self.ruta) or '.', exist_ok=True)
+            temporal = self.ruta + '.tmp'
+            with open(temporal, 'w', encoding='utf-8') as f:
+                f.write(''.join(json.dumps(r, ensure_ascii=False) + '\n' for r in recuerdos))
+                f.flush()
+                os.fsync(f.fileno())
+            if self._archivo is not None:
+                self._archivo.close()  # En Windows no se puede reemplazar un archivo abierto
+                self._archivo = None
+            os.replace(temporal, self.ruta)
+            self._lineas = len(recuerdos)
+
+    def cerrar(self):
+        with self._lock:
+            if self._archivo is not None:
+                self._archivo.close()
+                self._archivo = None
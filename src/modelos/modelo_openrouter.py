@@ -1,7 +1,7 @@
-import requests
 import os
 from typing import Optional
 from dotenv import load_dotenv
+from src.utils.cliente_http import obtener_cliente_http
 
 class ModeloOpenRouter:
     def __init__(self, api_key: Optional[str] = None, model: str = "mistralai/mistral-7b-instruct"):
@@ -51,7 +51,8 @@ class ModeloOpenRouter:
             "top_p": 0.95
         }
         try:
-            response = requests.post(self.base_url, headers=headers, json=data, timeout=30)
+            # Conexión keep-alive compartida: las llamadas seguidas no repiten el handshake TLS
+            response = obtener_cliente_http().post(self.base_url, headers=headers, json=data, timeout=30)
             response.raise_for_status()
             result = response.json()
             return result["choices"][0]["message"]["content"].strip()
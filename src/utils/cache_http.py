@@ -0,0 +1,235 @@
+"""
+Caché persistente de respuestas HTTP para Sassy.
+Guarda en SQLite las respuestas GET de las búsquedas web (Wikipedia, Google,
+DuckDuckGo, páginas completas) con un tiempo de vida por host. Al vencer se
+revalidan con ETag/Last-Modified: un 304 renueva la entrada sin volver a
+descargar el cuerpo. El tamaño total está acotado y se descartan primero las
+entradas usadas hace más tiempo (LRU). En modo sin conexión solo se sirve lo
+que haya en caché, aunque esté vencido. Las entradas más usadas se mantienen
+también en RAM, y la fecha de último uso se escribe por lotes: un acierto no
+toca el disco.
+"""
+
+import json
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from src.memoria.conexion import ConexionesSQLite
+
+
+# Entradas que se mantienen también en RAM, y tamaño máximo de cada una
+ENTRADAS_EN_MEMORIA = 256
+MAX_BYTES_EN_MEMORIA = 256 * 1024
+# Usos acumulados antes de escribir las fechas de último uso
+USOS_POR_LOTE = 100
+# Parámetros de consulta con credenciales (p. ej. la clave de Google Custom Search): nunca se guardan en la clave
+PARAMETROS_CREDENCIALES = frozenset(('key', 'cx', 'api_key', 'apikey', 'access_token', 'token'))
+
+
+def leer_limitado(respuesta, max_bytes):
+    """Lee como mucho `max_bytes` del cuerpo de una respuesta pedida con stream=True y libera la conexión."""
+    if respuesta._content is not False:  # Ya leída (p. ej. servida desde la caché)
+        return respuesta
+    partes = []
+    leidos = 0
+    try:
+        for parte in respuesta.iter_content(64 * 1024):
+            partes.append(parte)
+            leidos += len(parte)
+            if leidos >= max_bytes:
+                break
+    finally:
+        respuesta.close()
+    respuesta._content = b''.join(partes)[:max_bytes]
+    respuesta._content_consumed = True
+    return respuesta
+
+
+class SinConexion(requests.RequestException):
+    """Modo sin conexión y la URL no está en caché."""
+
+
+class CacheHTTP:
+    def __init__(self, ruta, ttl_por_host=None, ttl_defecto=3600, max_bytes=200 * 2 ** 20, modo_offline=False):
+        self.ttl_por_host = ttl_por_host or {}
+        self.ttl_defecto = ttl_defecto
+        self.max_bytes = max_bytes
+        self.modo_offline = modo_offline
+        self._db = ConexionesSQLite(ruta)
+        self._lock = threading.Lock()
+        self._memoria = OrderedDict()
+        self._usos_pendientes = {}
+        with self._db.transaccion(inmediata=True) as c:
+            c.execute("""
+                CREATE TABLE IF NOT EXISTS respuestas (
+                    clave TEXT PRIMARY KEY,
+                    estado INTEGER NOT NULL,
+                    cabeceras TEXT NOT NULL,
+                    cuerpo BLOB NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT,
+                    expira REAL NOT NULL,
+                    ultimo_uso REAL NOT NULL,
+                    tamano INTEGER NOT NULL
+                )
+            """)
+            c.execute("CREATE INDEX IF NOT EXISTS idx_respuestas_uso ON respuestas(ultimo_uso)")
+            # Entradas de versiones que guardaban la URL con credenciales
+            antiguas = [(clave,) for clave, in c.execute("SELECT clave FROM respuestas WHERE clave LIKE '%?%'") if self.clave(clave) != clave]
+            c.executemany("DELETE FROM respuestas WHERE clave = ?", antiguas)
+            c.execute("SELECT COALESCE(SUM(tamano), 0) FROM respuestas")
+            self._bytes = c.fetchone()[0]
+
+    def ttl(self, url):
+        return self.ttl_por_host.get(urlsplit(url).hostname, self.ttl_defecto)
+
+    @staticmethod
+    def clave(url, params=None):
+        """URL final con los parámetros de consulta, tal como la enviaría requests, sin credenciales."""
+        if params:
+            url = requests.Request('GET', url, params=params).prepare().url
+        partes = urlsplit(url)
+        if not partes.query:
+            return url
+        consulta = parse_qsl(partes.query, keep_blank_values=True)
+        if not any(nombre.lower() in PARAMETROS_CREDENCIALES for nombre, _ in consulta):
+            return url
+        consulta = [(nombre, valor) for nombre, valor in consulta if nombre.lower() not in PARAMETROS_CREDENCIALES]
+        return urlunsplit(partes._replace(query=urlencode(consulta)))
+
+    def _leer(self, clave):
+        with self._lock:
+            fila = self._memoria.get(clave)
+            if fila is not None:
+                self._memoria.move_to_end(clave)
+                return fila
+        fila = self._db.cursor().execute(
+            "SELECT estado, cabeceras, cuerpo, etag, last_modified, expira FROM respuestas WHERE clave = ?", (clave,)
+        ).fetchone()
+        if fila is not None:
+            self._recordar(clave, fila)
+        return fila
+
+    def _recordar(self, clave, fila):
+        if len(fila[2]) > MAX_BYTES_EN_MEMORIA:
+            return
+        with self._lock:
+            self._memoria[clave] = fila
+            self._memoria.move_to_end(clave)
+            while len(self._memoria) > ENTRADAS_EN_MEMORIA:
+                self._memoria.popitem(last=False)
+
+    def vigente(self, url, params=None):
+        """La respuesta en caché si todavía no venció (o si se está sin conexión); None si no."""
+        clave = self.clave(url, params)
+        fila = self._leer(clave)
+        if fila is None:
+            if self.modo_offline:
+                raise SinConexion(f'Sin conexión y sin caché para {clave}')
+            return None
+        if self.modo_offline or fila[5] > time.time():
+            self._usar(clave)
+            return self._respuesta(clave, fila)
+        return None
+
+    def obtener(self, sesion, url, params=None, headers=None, max_bytes=None, **kwargs):
+        """GET a través de la caché: sirve lo vigente, revalida lo vencido y guarda lo nuevo.
+
+        Con `max_bytes` el cuerpo se descarga por partes y se corta en ese tamaño (y así se guarda).
+        """
+        vigente = self.vigente(url, params)
+        if vigente is not None:
+            return vigente
+        clave = self.clave(url, params)
+        fila = self._leer(clave)
+        headers = dict(headers or {})
+        if fila is not None:
+            if fila[3]:
+                headers['If-None-Match'] = fila[3]
+            if fila[4]:
+                headers['If-Modified-Since'] = fila[4]
+        respuesta = sesion.get(url, params=params, headers=headers, stream=max_bytes is not None, **kwargs)
+        if max_bytes is not None:
+            leer_limitado(respuesta, max_bytes)
+        if respuesta.status_code == 304 and fila is not None:
+            fila = fila[:5] + (time.time() + self.ttl(url),)
+            with self._db.transaccion() as c:
+                c.execute("UPDATE respuestas SET expira = ?, ultimo_uso = ? WHERE clave = ?", (fila[5], time.time(), clave))
+            self._recordar(clave, fila)
+            return self._respuesta(clave, fila)
+        if respuesta.status_code == 200 and 'no-store' not in respuesta.headers.get('Cache-Control', ''):
+            self._guardar(clave, url, respuesta)
+        return respuesta
+
+    def _guardar(self, clave, url, respuesta):
+        cuerpo = respuesta.content
+        # Se guarda el cuerpo ya descomprimido: sin Content-Encoding/Length para no decodificarlo dos veces
+        cabeceras = {k: v for k, v in respuesta.headers.items() if k.lower() not in ('content-encoding', 'content-length', 'transfer-encoding')}
+        ahora = time.time()
+        etag, last_modified = respuesta.headers.get('ETag'), respuesta.headers.get('Last-Modified')
+        self._escribir_usos()
+        with self._lock:
+            with self._db.transaccion(inmediata=True) as c:
+                c.execute("SELECT tamano FROM respuestas WHERE clave = ?", (clave,))
+                anterior = c.fetchone()
+                c.execute(
+                    "INSERT OR REPLACE INTO respuestas (clave, estado, cabeceras, cuerpo, etag, last_modified, expira, ultimo_uso, tamano) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (clave, respuesta.status_code, json.dumps(cabeceras), cuerpo, etag, last_modified,
+                     ahora + self.ttl(url), ahora, len(cuerpo))
+                )
+                self._bytes += len(cuerpo) - (anterior[0] if anterior else 0)
+                if self._bytes > self.max_bytes:
+                    self._desalojar(c)
+        self._recordar(clave, (respuesta.status_code, json.dumps(cabeceras), cuerpo, etag, last_modified, ahora + self.ttl(url)))
+
+    def _desalojar(self, c):
+        """Borra las entradas menos usadas hasta quedar en el 90% del límite."""
+        objetivo = self.max_bytes * 0.9
+        for clave, tamano in c.execute("SELECT clave, tamano FROM respuestas ORDER BY ultimo_uso").fetchall():
+            if self._bytes <= objetivo:
+                break
+            c.execute("DELETE FROM respuestas WHERE clave = ?", (clave,))
+            self._memoria.pop(clave, None)
+            self._bytes -= tamano
+
+    def _usar(self, clave):
+        with self._lock:
+            self._usos_pendientes[clave] = time.time()
+            lleno = len(self._usos_pendientes) >= USOS_POR_LOTE
+        if lleno:
+            self._escribir_usos()
+
+    def _escribir_usos(self):
+        """Guarda de una vez las fechas de último uso acumuladas (para el desalojo LRU)."""
+        with self._lock:
+            usos, self._usos_pendientes = self._usos_pendientes, {}
+        if usos:
+            with self._db.transaccion() as c:
+                c.executemany("UPDATE respuestas SET ultimo_uso = ? WHERE clave = ?", [(t, k) for k, t in usos.items()])
+
+    @staticmethod
+    def _respuesta(clave, fila):
+        """Reconstruye un requests.Response desde una fila de la caché."""
+        respuesta = requests.Response()
+        respuesta.status_code = fila[0]
+        respuesta.headers = CaseInsensitiveDict(json.loads(fila[1]))
+        respuesta._content = bytes(fila[2])
+        respuesta._content_consumed = True
+        respuesta.url = clave
+        respuesta.encoding = requests.utils.get_encoding_from_headers(respuesta.headers)
+        respuesta.from_cache = True
+        return respuesta
+
+    def limpiar(self):
+        with self._lock:
+            with self._db.transaccion(inmediata=True) as c:
+                c.execute("DELETE FROM respuestas")
+            self._bytes = 0
+            self._memoria.clear()
+            self._usos_pendientes.clear()
@@ -0,0 +1,72 @@
+"""
+Cliente HTTP compartido para Sassy.
+Una sola requests.Session por proceso, con un pool de conexiones keep-alive
+por host: las peticiones repetidas a Wikipedia, Google u OpenRouter reutilizan
+la conexión TCP/TLS en vez de negociarla de nuevo cada vez. Las respuestas se
+piden comprimidas (gzip/deflate). El pool de urllib3 es seguro entre hilos.
+Los GET pasan además por la caché persistente de respuestas (cache_http).
+"""
+
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src.core.config import (
+    HTTP_TIMEOUT, HTTP_HOSTS_EN_POOL, HTTP_CONEXIONES_POR_HOST, HTTP_CACHE_RUTA, HTTP_CACHE_MAX_MB,
+    HTTP_CACHE_TTL_DEFECTO, HTTP_CACHE_TTL_POR_HOST, HTTP_MODO_OFFLINE
+)
+from src.utils.cache_http import CacheHTTP, leer_limitado
+
+
+class ClienteHTTP:
+    def __init__(self, timeout=HTTP_TIMEOUT, hosts_en_pool=HTTP_HOSTS_EN_POOL, conexiones_por_host=HTTP_CONEXIONES_POR_HOST, cache=None):
+        """`hosts_en_pool`: hosts con conexiones guardadas; `conexiones_por_host`: conexiones abiertas por host.
+
+        `cache` es una CacheHTTP para los GET (None = sin caché).
+        """
+        self.timeout = timeout
+        self.cache = cache
+        self.sesion = requests.Session()
+        adaptador = HTTPAdapter(pool_connections=hosts_en_pool, pool_maxsize=conexiones_por_host)
+        self.sesion.mount('http://', adaptador)
+        self.sesion.mount('https://', adaptador)
+        self.sesion.headers['Accept-Encoding'] = 'gzip, deflate'
+
+    def get(self, url, timeout=None, usar_cache=True, max_bytes=None, **kwargs):
+        """GET; con `max_bytes` el cuerpo se lee por partes y no pasa de ese tamaño."""
+        if self.cache is not None and usar_cache:
+            return self.cache.obtener(self.sesion, url, timeout=timeout or self.timeout, max_bytes=max_bytes, **kwargs)
+        if max_bytes is None:
+            return self.sesion.get(url, timeout=timeout or self.timeout, **kwargs)
+        return leer_limitado(self.sesion.get(url, timeout=timeout or self.timeout, stream=True, **kwargs), max_bytes)
+
+    def desde_cache(self, url, params=None, **kwargs):
+        """La respuesta vigente en caché, sin tocar la red; None si hay que pedirla."""
+        if self.cache is None:
+            return None
+        return self.cache.vigente(url, params)
+
+    def post(self, url, timeout=None, **kwargs):
+        return self.sesion.post(url, timeout=timeout or self.timeout, **kwargs)
+
+    def cerrar(self):
+        self.sesion.close()
+
+
+_cliente = None
+_lock_cliente = threading.Lock()
+
+def obtener_cliente_http():
+    """Devuelve el ClienteHTTP compartido del proceso, creándolo la primera vez."""
+    global _cliente
+    with _lock_cliente:
+        if _cliente is None:
+            _cliente = ClienteHTTP(cache=CacheHTTP(
+                HTTP_CACHE_RUTA,
+                ttl_por_host=HTTP_CACHE_TTL_POR_HOST,
+                ttl_defecto=HTTP_CACHE_TTL_DEFECTO,
+                max_bytes=HTTP_CACHE_MAX_MB * 2 ** 20,
+                modo_offline=HTTP_MODO_OFFLINE
+            ))
+        return _cliente
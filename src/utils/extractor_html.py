@@ -0,0 +1,134 @@
+"""
+Extracción de texto de páginas HTML para Sassy.
+Saca los párrafos (<p>) de una página en una sola pasada, descartando lo que
+no es contenido (scripts, estilos, menús, cabeceras, pies, formularios).
+Usa selectolax o lxml si están instalados; si no, un analizador de la
+biblioteca estándar que no construye árbol.
+"""
+
+import re
+from html.parser import HTMLParser
+
+try:
+    from selectolax.parser import HTMLParser as ArbolSelectolax
+except ImportError:
+    ArbolSelectolax = None
+
+try:
+    import lxml.html
+    import lxml.etree
+except ImportError:
+    lxml = None
+
+BACKENDS = ('auto', 'selectolax', 'lxml', 'html.parser')
+
+# Elementos cuyo contenido nunca es texto del artículo
+BOILERPLATE = ('script', 'style', 'noscript', 'template', 'nav', 'header', 'footer', 'aside', 'form', 'iframe', 'svg')
+
+# Etiquetas de bloque que cierran un <p> abierto (al abrirse o al cerrarse su contenedor)
+_CIERRAN_PARRAFO = frozenset((
+    'p', 'div', 'section', 'article', 'main', 'body', 'blockquote', 'pre', 'table', 'tr', 'td', 'th',
+    'ul', 'ol', 'li', 'dl', 'dd', 'dt', 'figure', 'hr', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6'
+))
+
+_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+
+
+def resolver_backend(backend='auto'):
+    """Traduce 'auto' al analizador más rápido instalado."""
+    if backend not in BACKENDS:
+        raise ValueError(f'Analizador HTML no soportado: {backend}')
+    if backend == 'auto':
+        if ArbolSelectolax is not None:
+            return 'selectolax'
+        return 'lxml' if lxml is not None else 'html.parser'
+    if (backend == 'selectolax' and ArbolSelectolax is None) or (backend == 'lxml' and lxml is None):
+        return 'html.parser'
+    return backend
+
+
+def decodificar(cuerpo, content_type=None):
+    """Bytes de la página a texto: charset de la cabecera, luego el de <meta>, y si no UTF-8."""
+    codificacion = None
+    if content_type and 'charset=' in content_type.lower():
+        codificacion = content_type.lower().split('charset=')[-1].split(';')[0].strip(' "\'')
+    else:
+        m = _CHARSET.search(cuerpo[:4096])
+        if m:
+            codificacion = m.group(1).decode('ascii')
+    try:
+        return cuerpo.decode(codificacion or 'utf-8', errors='replace')
+    except LookupError:
+        return cuerpo.decode('utf-8', errors='replace')
+
+
+def extraer_parrafos(html, minimo=60, backend='auto'):
+    """Texto de los párrafos de más de `minimo` caracteres, en orden de aparición."""
+    if not html:
+        return []
+    backend = resolver_backend(backend)
+    if backend == 'selectolax':
+        return _parrafos_selectolax(html, minimo)
+    if backend == 'lxml':
+        return _parrafos_lxml(html, minimo)
+    analizador = _ParrafosHTML(minimo)
+    analizador.feed(html)
+    analizador.close()
+    return analizador.parrafos
+
+
+def _parrafos_selectolax(html, minimo):
+    arbol = ArbolSelectolax(html)
+    arbol.strip_tags(list(BOILERPLATE))
+    return [texto for texto in (p.text() for p in arbol.css('p')) if len(texto) > minimo]
+
+
+def _parrafos_lxml(html, minimo):
+    try:
+        documento = lxml.html.document_fromstring(html)
+    except lxml.etree.ParserError:  # Documento vacío o solo comentarios
+        return []
+    lxml.etree.strip_elements(documento, *BOILERPLATE, with_tail=False)
+    return [texto for texto in (p.text_content() for p in documento.iter('p')) if len(texto) > minimo]
+
+
+class _ParrafosHTML(HTMLParser):
+    """Recorre los eventos del analizador estándar y va juntando el texto de cada <p>."""
+
+    def __init__(self, minimo):
+        super().__init__(convert_charrefs=True)
+        self.minimo = minimo
+        self.parrafos = []
+        # Profundidad dentro de elementos BOILERPLATE; mientras sea > 0 se ignora el texto
+        self._omitir = 0
+        self._actual = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in BOILERPLATE:
+            self._omitir += 1
+        elif tag in _CIERRAN_PARRAFO:
+            self._cerrar()
+            if tag == 'p' and not self._omitir:
+                self._actual = []
+
+    def handle_endtag(self, tag):
+        if tag in BOILERPLATE:
+            if self._omitir:
+                self._omitir -= 1
+        elif tag in _CIERRAN_PARRAFO:
+            self._cerrar()
+
+    def handle_data(self, data):
+        if self._actual is not None and not self._omitir:
+            self._actual.append(data)
+
+    def _cerrar(self):
+        if self._actual is not None:
+            texto = ''.join(self._actual)
+            if len(texto) > self.minimo:
+                self.parrafos.append(texto)
+            self._actual = None
+
+    def close(self):
+        super().close()
+        self._cerrar()
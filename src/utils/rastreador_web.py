@@ -0,0 +1,182 @@
+"""
+Rastreador web concurrente para Sassy.
+Ejecuta muchas búsquedas en paralelo con un grupo acotado de hilos, sin
+saturar a ningún sitio: cada host tiene un límite de peticiones simultáneas y
+un cubo de tokens (peticiones por segundo). Los fallos transitorios se
+reintentan con espera exponencial y aleatoria, y todo el trabajo respeta un
+plazo global.
+
+Las funciones de web_multi_search usan el rastreador automáticamente cuando
+se ejecutan dentro de RastreadorWeb.ejecutar (ver rastreador_actual).
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlsplit
+
+import requests
+
+from src.utils.cliente_http import obtener_cliente_http
+
+# Respuestas que suelen resolverse solas al reintentar
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+_local = threading.local()
+_FIN = object()
+
+
+def rastreador_actual():
+    """El RastreadorWeb que ejecuta la tarea del hilo actual, o None fuera de él."""
+    return getattr(_local, 'rastreador', None)
+
+
+class PlazoAgotado(Exception):
+    """Se alcanzó el plazo global del rastreo."""
+
+
+class CuboTokens:
+    def __init__(self, tasa, capacidad):
+        """`tasa` tokens por segundo, acumulando como mucho `capacidad` (la ráfaga permitida)."""
+        self.tasa = tasa
+        self.capacidad = capacidad
+        self._tokens = float(capacidad)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def tomar(self, limite=None):
+        """Espera hasta obtener un token. Devuelve False si antes se llegaría a `limite` (monotonic)."""
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+                self._ultimo = ahora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                espera = (1 - self._tokens) / self.tasa
+            if limite is not None and ahora + espera > limite:
+                return False
+            time.sleep(espera)
+
+
+class RastreadorWeb:
+    def __init__(self, trabajadores=8, concurrencia_por_host=4, tasa_por_host=5.0, rafaga_por_host=5,
+                 reintentos=2, espera_base=0.5, plazo=None, peticion=None, cliente=None):
+        """`plazo` en segundos para todo el rastreo (None = sin límite).
+
+        Por defecto usa el cliente HTTP compartido; `peticion` lo sustituye por otra función GET.
+        """
+        self.trabajadores = trabajadores
+        self.concurrencia_por_host = concurrencia_por_host
+        self.tasa_por_host = tasa_por_host
+        self.rafaga_por_host = rafaga_por_host
+        self.reintentos = reintentos
+        self.espera_base = espera_base
+        self.plazo = plazo
+        self._cliente = None if peticion else (cliente or obtener_cliente_http())
+        self._peticion = peticion or self._cliente.get
+        self._hosts = {}
+        self._lock = threading.Lock()
+        self._limite = None
+        self._detenido = threading.Event()
+
+    def _host(self, url):
+        """Semáforo y cubo de tokens del host de `url`, creados la primera vez."""
+        host = urlsplit(url).hostname or ''
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = (
+                    threading.BoundedSemaphore(self.concurrencia_por_host),
+                    CuboTokens(self.tasa_por_host, self.rafaga_por_host)
+                )
+            return self._hosts[host]
+
+    def restante(self):
+        """Segundos que quedan del plazo global (None si no hay plazo)."""
+        if self._limite is None:
+            return None
+        return max(0.0, self._limite - time.monotonic())
+
+    def obtener(self, url, timeout=5, **kwargs):
+        """GET respetando los límites del host, con reintentos y sin pasarse del plazo global."""
+        # Lo que ya está en caché no consume cupo del host ni espera turno
+        if self._cliente is not None:
+            respuesta = self._cliente.desde_cache(url, **kwargs)
+            if respuesta is not None:
+                return respuesta
+        semaforo, cubo = self._host(url)
+        for intento in range(self.reintentos + 1):
+            if self._detenido.is_set():
+                raise PlazoAgotado('rastreo detenido')
+            restante = self.restante()
+            if restante is not None and restante <= 0:
+                raise PlazoAgotado(url)
+            if not semaforo.acquire(timeout=restante):
+                raise PlazoAgotado(url)
+            try:
+                if not cubo.tomar(self._limite):
+                    raise PlazoAgotado(url)
+                restante = self.restante()
+                try:
+                    respuesta = self._peticion(url, timeout=timeout if restante is None else min(timeout, restante), **kwargs)
+                except (requests.ConnectionError, requests.Timeout):
+                    if intento == self.reintentos:
+                        raise
+                    respuesta = None
+            finally:
+                semaforo.release()
+            if respuesta is not None and (respuesta.status_code not in ESTADOS_REINTENTABLES or intento == self.reintentos):
+                return respuesta
+            self._esperar_reintento(intento, respuesta)
+        return respuesta
+
+    def _esperar_reintento(self, intento, respuesta):
+        espera = self.espera_base * 2 ** intento * random.uniform(0.5, 1.5)
+        retry_after = respuesta.headers.get('Retry-After') if respuesta is not None else None
+        if retry_after and retry_after.isdigit():
+            espera = max(espera, float(retry_after))
+        restante = self.restante()
+        if restante is not None and espera >= restante:
+            raise PlazoAgotado('no queda plazo para reintentar')
+        self._detenido.wait(espera)
+
+    def ejecutar(self, tareas, funcion):
+        """Aplica `funcion` a cada tarea en paralelo y va entregando (tarea, resultado, error) según terminan.
+
+        Deja de lanzar tareas al agotarse el plazo o al llamar a detener(); las ya lanzadas terminan.
+        """
+        self._detenido.clear()
+        self._limite = time.monotonic() + self.plazo if self.plazo is not None else None
+        pendientes = iter(tareas)
+        en_curso = {}
+
+        def trabajar(tarea):
+            _local.rastreador = self
+            try:
+                return funcion(tarea)
+            finally:
+                _local.rastreador = None
+
+        with ThreadPoolExecutor(max_workers=self.trabajadores, thread_name_prefix='rastreador') as grupo:
+            def lanzar():
+                # Como mucho el doble de tareas que hilos en vuelo: las consultas no se encolan todas de golpe
+                while len(en_curso) < self.trabajadores * 2 and not self._detenido.is_set() and self.restante() != 0:
+                    tarea = next(pendientes, _FIN)
+                    if tarea is _FIN:
+                        return
+                    en_curso[grupo.submit(trabajar, tarea)] = tarea
+
+            lanzar()
+            while en_curso:
+                hechos, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                for futuro in hechos:
+                    tarea = en_curso.pop(futuro)
+                    error = futuro.exception()
+                    yield tarea, (None if error else futuro.result()), error
+                lanzar()
+
+    def detener(self):
+        """Deja de lanzar tareas y corta esperas y reintentos de las que están en curso."""
+        self._detenido.set()
@@ -1,33 +1,54 @@
 """
 Módulo de búsqueda web combinada para Sassy.
 Intenta buscar información en varias fuentes (Google Custom Search API, Wikipedia) y devuelve el primer resultado útil.
+Los fallos de red (conexión, tiempo de espera, sitio caído, plazo agotado, modo sin
+conexión) se propagan como excepciones para no confundirlos con "sin resultado".
 """
 
-import requests
 import os
-from bs4 import BeautifulSoup
+import requests
 from dotenv import load_dotenv
+from src.core.config import WEB_MAX_BYTES_PAGINA
+from src.utils.extractor_html import decodificar, extraer_parrafos
+from src.utils.rastreador_web import rastreador_actual, ESTADOS_REINTENTABLES, PlazoAgotado
+from src.utils.cliente_http import obtener_cliente_http
 
 load_dotenv()
 GOOGLE_API_KEY = os.getenv('GOOGLE_API_KEY')
 GOOGLE_CSE_ID = os.getenv('GOOGLE_CSE_ID')
 
+def _get(url, timeout=5, **kwargs):
+    """GET con el cliente HTTP compartido; dentro de un rastreo concurrente pasa por sus límites por host.
+
+    Un estado reintentable (429, 5xx) que persiste se lanza como requests.HTTPError.
+    """
+    rastreador = rastreador_actual()
+    if rastreador is not None:
+        resp = rastreador.obtener(url, timeout=timeout, **kwargs)
+    else:
+        resp = obtener_cliente_http().get(url, timeout=timeout, **kwargs)
+    if resp.status_code in ESTADOS_REINTENTABLES:
+        raise requests.HTTPError(f"{resp.status_code} en {url}", response=resp)
+    return resp
+
 def buscar_wikipedia(query):
     try:
         # Buscar el título real del artículo
         url_api = f"https://es.wikipedia.org/w/api.php?action=query&list=search&srsearch={query.replace(' ', '%20')}&format=json"
-        resp_api = requests.get(url_api, timeout=5)
+        resp_api = _get(url_api, timeout=5)
         if resp_api.status_code == 200:
             data_api = resp_api.json()
             if 'query' in data_api and 'search' in data_api['query'] and len(data_api['query']['search']) > 0:
                 title = data_api['query']['search'][0]['title']
                 url_summary = f"https://es.wikipedia.org/api/rest_v1/page/summary/{title.replace(' ', '_')}"
-                resp = requests.get(url_summary, timeout=5)
+                resp = _get(url_summary, timeout=5)
                 if resp.status_code == 200:
                     data = resp.json()
                     if 'extract' in data and data['extract']:
                         enlace = f"https://es.wikipedia.org/wiki/{title.replace(' ', '_')}"
                         return f"{data['extract']}\nEnlace: {enlace} (Fuente: Wikipedia)"
+    except (requests.RequestException, PlazoAgotado):
+        raise
     except Exception:
         pass
     return None
@@ -38,7 +59,7 @@ def buscar_google_api(query):
             f"https://www.googleapis.com/customsearch/v1?q={query.replace(' ', '+')}"
             f"&key={GOOGLE_API_KEY}&cx={GOOGLE_CSE_ID}&num=1"
         )
-        resp = requests.get(url, timeout=5)
+        resp = _get(url, timeout=5)
         if resp.status_code == 200:
             data = resp.json()
             if 'items' in data and len(data['items']) > 0:
@@ -49,6 +70,8 @@ def buscar_google_api(query):
                 texto = f"{titulo}\n{snippet}\nURL: {link} (Fuente: Google API)"
                 if len(texto) > 30:
                     return texto
+    except (requests.RequestException, PlazoAgotado):
+        raise
     except Exception:
         pass
     return None
@@ -64,7 +87,12 @@ def buscar_multiweb(query, extra_info=False):
     # 1. Google Custom Search API
     resultado = None
     extra = ""
-    res = buscar_google_api(consulta_simple)
+    # Si una fuente falla por la red se prueba la siguiente; el fallo solo se lanza si ninguna respondió
+    fallo = None
+    try:
+        res = buscar_google_api(consulta_simple)
+    except requests.RequestException as e:
+        res, fallo = None, e
     if res and len(res) > 30:
         resultado = res
         # Intentar obtener contenido extendido de la URL
@@ -74,13 +102,18 @@ def buscar_multiweb(query, extra_info=False):
                 if l.startswith("URL: "):
                     url = l[5:].split()[0]
             if url:
-                extra = obtener_contenido_url(url)
+                extra = _contenido_extra(url)
         if resultado and (not extra_info):
             return resultado
         if resultado and extra_info:
             return resultado, extra
     # 2. Wikipedia
-    res = buscar_wikipedia(consulta_simple)
+    try:
+        res = buscar_wikipedia(consulta_simple)
+    except requests.RequestException as e:
+        if fallo is None:
+            fallo = e
+        res = None
     if res:
         resultado = res
         # Intentar obtener más texto útil del artículo
@@ -90,23 +123,34 @@ def buscar_multiweb(query, extra_info=False):
                 if l.startswith("Enlace: "):
                     url = l[8:].split()[0]
             if url:
-                extra = obtener_contenido_url(url)
+                extra = _contenido_extra(url)
         if resultado and (not extra_info):
             return resultado
         if resultado and extra_info:
             return resultado, extra
+    if fallo is not None:
+        raise fallo
     if extra_info:
         return None, ""
     return None
 
+def _contenido_extra(url):
+    """Texto de la página del resultado; si no se puede descargar, el resultado principal basta."""
+    try:
+        return obtener_contenido_url(url)
+    except requests.RequestException:
+        return ""
+
 def obtener_contenido_url(url):
     try:
         headers = {"User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"}
-        resp = requests.get(url, headers=headers, timeout=7)
-        soup = BeautifulSoup(resp.text, 'html.parser')
+        # Solo los primeros WEB_MAX_BYTES_PAGINA: el texto útil para la memoria está al principio
+        resp = _get(url, headers=headers, timeout=7, max_bytes=WEB_MAX_BYTES_PAGINA)
         # Extraer los párrafos más largos
-        parrafos = [p.get_text() for p in soup.find_all('p') if len(p.get_text()) > 60]
+        parrafos = extraer_parrafos(decodificar(resp.content, resp.headers.get('Content-Type')))
         texto = '\n'.join(parrafos)
         return texto.strip()
+    except (requests.RequestException, PlazoAgotado):
+        raise
     except Exception:
         return "" 
\ No newline at end of file
@@ -1,7 +1,7 @@
 """
 Módulo de búsqueda web para Sassy usando DuckDuckGo.
 """
-import requests
+from src.utils.cliente_http import obtener_cliente_http
 
 def buscar_duckduckgo(query):
     """Realiza una búsqueda en DuckDuckGo y retorna el mejor resultado posible."""
@@ -14,7 +14,7 @@ def buscar_duckduckgo(query):
         "skip_disambig": 1
     }
     try:
-        resp = requests.get(url, params=params, timeout=5)
+        resp = obtener_cliente_http().get(url, params=params, timeout=5)
         data = resp.json()
         if data.get("AbstractText"):
             return data["AbstractText"] + (f"\nMás info: {data['AbstractURL']}" if data.get("AbstractURL") else "")
@@ -0,0 +1,85 @@
+"""
+Fallos de red durante la nutrición web de Sassy.
+Una caída de conexión, el plazo agotado o detener el rastreo no deben quedar
+registrados como "sin resultado": la consulta tiene que seguir pendiente.
+"""
+
+import time
+
+import numpy as np
+import requests
+
+import src.memoria.memoria as modulo_memoria
+from src.memoria.memoria import MemoriaContextual
+from src.utils.cliente_http import ClienteHTTP
+from src.utils.rastreador_web import PlazoAgotado, RastreadorWeb
+from src.utils.web_multi_search import buscar_multiweb
+
+
+class CodificadorFijo:
+    def encode(self, textos, batch_size=64, **kwargs):
+        return np.ones((len(textos), 8), dtype=np.float32) / np.sqrt(8)
+
+
+class MonitorFalso:
+    def __init__(self, total):
+        self.cerrado = False
+
+    def actualizar(self, *args):
+        pass
+
+    def programar_actualizacion(self, funcion, ms):
+        pass
+
+
+def cliente_sin_red():
+    cliente = ClienteHTTP()
+
+    def fallar(url, **kwargs):
+        raise requests.ConnectionError(f'sin red: {url}')
+
+    cliente.sesion.get = fallar
+    return cliente
+
+
+def test_buscar_multiweb_propaga_caida_de_conexion():
+    rastreador = RastreadorWeb(trabajadores=1, reintentos=0, cliente=cliente_sin_red())
+    (consulta, resultado, error), = rastreador.ejecutar(['python'], lambda c: buscar_multiweb(c, extra_info=True))
+    assert resultado is None
+    assert isinstance(error, requests.ConnectionError)
+
+
+def test_buscar_multiweb_propaga_rastreo_detenido():
+    rastreador = RastreadorWeb(trabajadores=1, reintentos=0, cliente=cliente_sin_red())
+
+    def detener_y_buscar(consulta):
+        rastreador.detener()
+        return buscar_multiweb(consulta, extra_info=True)
+
+    (consulta, resultado, error), = rastreador.ejecutar(['python'], detener_y_buscar)
+    assert resultado is None
+    assert isinstance(error, PlazoAgotado)
+
+
+def test_nutricion_sin_red_deja_consultas_pendientes(tmp_path, monkeypatch):
+    monkeypatch.setattr(modulo_memoria, 'NutricionMonitor', MonitorFalso)
+    monkeypatch.setattr(
+        modulo_memoria, 'RastreadorWeb',
+        lambda **kwargs: RastreadorWeb(**dict(kwargs, reintentos=0, tasa_por_host=1e6, rafaga_por_host=1000), cliente=cliente_sin_red())
+    )
+    memoria = MemoriaContextual(str(tmp_path / 'memoria.db'), nutricion_activa=False, modelo_embeddings=CodificadorFijo())
+    memoria._nutricion_en_curso = True
+    memoria.nutrir_memoria_desde_internet()
+    limite = time.time() + 60
+    while memoria._nutricion_en_curso and time.time() < limite:
+        time.sleep(0.05)
+    assert not memoria._nutricion_en_curso
+
+    c = memoria._db.cursor()
+    estados = dict(c.execute("SELECT estado, COUNT(*) FROM nutricion_consultas GROUP BY estado").fetchall())
+    assert set(estados) == {'error'}
+    # Los fallos cuentan como intento pero la consulta se vuelve a planificar
+    consultas = [fila[0] for fila in c.execute("SELECT consulta FROM nutricion_consultas ORDER BY prioridad, orden")]
+    with memoria._db.transaccion() as c:
+        assert memoria.registro_nutricion.planificar(c, [consultas]) == consultas
+    memoria.guardar_estado_final()